@@ -17,7 +17,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from .address import Address, GermanAddress
+from .address import Address, GermanAddress, AddressParseError
 from .letter import Letter
 from .design import Design
 from .person import Person
+from .fingerprint import fingerprint_fields
@@ -17,12 +17,38 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import re
 from typing import Optional, List
+from .fingerprint import fingerprint_fields
+
+# Precompiled patterns for address parsing:
+_WHITESPACE = re.compile(r"\s+")
+_DIGIT = re.compile(r"\d")
+_PLZ_CITY = re.compile(r"(\d+)\s+(\S.*)")
+
+
+class AddressParseError(ValueError):
+    """
+    An address could not be parsed.
+    """
+    address: str
+    reason: str
+
+    def __init__(self, address: str, reason: str):
+        super().__init__(reason)
+        self.address = address
+        self.reason = reason
+
 
 class Address:
     """
     An address.
+
+    Addresses are immutable values: they compare equal if their content
+    is equal, and their hash is computed only once.
     """
+    __slots__ = ("street", "number", "postalcode", "city", "_hash",
+                 "_composed", "_fingerprint")
     street: str
     number: str
     postalcode: int
@@ -30,13 +56,51 @@ class Address:
 
     def __init__(self, street: str, number: Optional[str],
                  postalcode: int, city: str):
-        self.street = str(street)
-        self.number = str(number) if number is not None else None
-        self.postalcode = int(postalcode)
-        self.city = str(city)
+        _set = object.__setattr__
+        _set(self, "street", str(street))
+        _set(self, "number", str(number) if number is not None else None)
+        _set(self, "postalcode", int(postalcode))
+        _set(self, "city", str(city))
+        _set(self, "_hash", None)
+        _set(self, "_composed", None)
+        _set(self, "_fingerprint", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("'" + type(self).__name__ + "' is immutable.")
+
+    def __delattr__(self, name):
+        raise AttributeError("'" + type(self).__name__ + "' is immutable.")
+
+    def _key(self) -> tuple:
+        return (self.street, self.number, self.postalcode, self.city)
 
     def __hash__(self):
-        return hash((self.street, self.number, self.postalcode, self.city))
+        h = self._hash
+        if h is None:
+            h = hash(self._key())
+            object.__setattr__(self, "_hash", h)
+        return h
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(self) is not type(other):
+            return NotImplemented
+        return hash(self) == hash(other) and self._key() == other._key()
+
+    def __reduce__(self):
+        return (type(self), (self.street, self.number, self.postalcode,
+                             self.city))
+
+    def fingerprint(self) -> bytes:
+        """
+        A content fingerprint that is stable across processes.
+        """
+        fp = self._fingerprint
+        if fp is None:
+            fp = fingerprint_fields(type(self).__name__, *self._key())
+            object.__setattr__(self, "_fingerprint", fp)
+        return fp
 
     def compose(self) -> List[str]:
         raise NotImplementedError("Address compose not implemented for address "
@@ -55,34 +119,47 @@ class GermanAddress(Address):
     """
     An address in Germany.
     """
+    __slots__ = ("plz_only",)
     plz_only: bool
     def __init__(self,
                  strasse: Optional[str] = None,
                  hausnummer: Optional[str] = None,
                  plz: int = 0,
                  stadt: str = ""):
-        self.plz_only = strasse is None and hausnummer is None
+        object.__setattr__(self, "plz_only",
+                           strasse is None and hausnummer is None)
         if strasse is not None:
             strasse = str(strasse)
         if hausnummer is not None:
             hausnummer = str(hausnummer)
         super().__init__(strasse, hausnummer, int(plz), str(stadt))
 
-    def __hash__(self):
-        return hash((self.street, self.number, self.postalcode, self.city,
-                     self.plz_only))
+    def _key(self) -> tuple:
+        return (self.street, self.number, self.postalcode, self.city,
+                self.plz_only)
+
+    def __reduce__(self):
+        if self.plz_only:
+            return (GermanAddress, (None, None, self.postalcode, self.city))
+        return (GermanAddress, (self.street, self.number, self.postalcode,
+                                self.city))
 
     def compose(self, international: bool = False) -> List[str]:
-        country = []
+        # The national composition is memoized:
+        composed = self._composed
+        if composed is None:
+            if self.plz_only:
+                composed = (str(self.postalcode) + " " + self.city,)
+            else:
+                has_number = self.number is not None
+                strnum = GermanAddress.format_street(self.street, has_number)
+                if has_number:
+                    strnum += " " + self.number
+                composed = (strnum, str(self.postalcode) + " " + self.city)
+            object.__setattr__(self, "_composed", composed)
         if international:
-            country.append("Germany")
-        if self.plz_only:
-            return [str(self.postalcode) + " " + self.city] + country
-        has_number = self.number is not None
-        strnum = GermanAddress.format_street(self.street, has_number)
-        if has_number:
-            strnum += " " + self.number
-        return [strnum, str(self.postalcode) + " " + self.city] + country
+            return list(composed) + ["Germany"]
+        return list(composed)
 
     @staticmethod
     def parse_address(addr: str) -> "GermanAddress":
@@ -94,7 +171,10 @@ class GermanAddress(Address):
         where "STREET NAME" is the (possibly multi-worded) street
         name, "XY" the one-word house number, "PLZ" the one-word
         postal code, and "CITY NAME" the (possibly multi-worded)
-        city name.
+        city name. The address is split at the last comma, so the
+        street part may itself contain commas.
+
+        Raises an `AddressParseError` if the address is malformed.
 
         This algorithm should cover most use cases but some degree of
         `falsehoods <https://www.mjt.me.uk/posts/falsehoods-programmers-believe-about-addresses/>`_
@@ -107,13 +187,17 @@ class GermanAddress(Address):
         if len(addr) == 0:
             return GermanAddress()
 
-        # Split the address by the comma:
-        strnum, zipcity = addr.split(",")
+        # Split the address by the last comma:
+        strnum, comma, zipcity = addr.rpartition(",")
+        if not comma:
+            raise AddressParseError(addr, "Street and postal code need to be "
+                                          "separated by a comma.")
 
         # Get street and number from the first half:
+        strnum = strnum.strip()
         strnum_split = strnum.split()
         if len(strnum_split) > 1:
-            if any(c.isdigit() for c in strnum_split[-1]):
+            if _DIGIT.search(strnum_split[-1]) is not None:
                 number = strnum_split[-1]
                 street = " ".join(strnum_split[:-1])
             else:
@@ -127,11 +211,14 @@ class GermanAddress(Address):
             number = None
 
         # Get postal code and city from the second half:
-        zipcity_split = zipcity.split()
-        if len(zipcity_split) <= 1:
-            raise ValueError("Postal code and city need to be given.")
-        plz = int(zipcity_split[0])
-        city = " ".join(zipcity_split[1:])
+        m = _PLZ_CITY.fullmatch(zipcity.strip())
+        if m is None:
+            if len(zipcity.split()) <= 1:
+                raise AddressParseError(addr, "Postal code and city need to "
+                                              "be given.")
+            raise AddressParseError(addr, "Postal code needs to be a number.")
+        plz = int(m.group(1))
+        city = _WHITESPACE.sub(" ", m.group(2))
 
         return GermanAddress(street, number, plz, city)
 
@@ -0,0 +1,158 @@
+# Bulk parsing and validation of addresses.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from time import perf_counter
+from pathlib import Path
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple, Callable, Type, \
+                   Union
+from .address import Address, GermanAddress
+
+
+class AddressRowError:
+    """
+    An address row that could not be parsed.
+    """
+    row: int
+    text: str
+    message: str
+
+    def __init__(self, row: int, text: str, message: str):
+        self.row = int(row)
+        self.text = str(text)
+        self.message = str(message)
+
+    def __repr__(self) -> str:
+        return "AddressRowError(" + str(self.row) + ", " + repr(self.text) \
+               + ", " + repr(self.message) + ")"
+
+
+class AddressBatchResult:
+    """
+    Result of parsing a batch of addresses.
+    """
+    addresses: List[Tuple[int, Address]]
+    errors: List[AddressRowError]
+    rows: int
+    seconds: float
+
+    def __init__(self, addresses: List[Tuple[int, Address]],
+                 errors: List[AddressRowError], rows: int, seconds: float):
+        self.addresses = addresses
+        self.errors = errors
+        self.rows = int(rows)
+        self.seconds = float(seconds)
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.seconds <= 0.0:
+            return float("inf")
+        return self.rows / self.seconds
+
+
+def _parse_chunk(chunk: Tuple[int, List[str], Type[Address]]) \
+        -> Tuple[List[Tuple[int, Address]], List[AddressRowError], int]:
+    """
+    Parse a chunk of rows starting at row index `start`. Returns the
+    parsed addresses, the errors, and the index after the last row.
+    """
+    start, lines, address_type = chunk
+    parse = address_type.parse_address
+    addresses = []
+    errors = []
+    for row, line in enumerate(lines, start):
+        # Empty rows are skipped:
+        if len(line) == 0 or line.isspace():
+            continue
+        try:
+            addresses.append((row, parse(line)))
+        except ValueError as e:
+            errors.append(AddressRowError(row, line, str(e)))
+    return addresses, errors, start + len(lines)
+
+
+def _chunks(rows: Iterable[str], chunksize: int,
+            address_type: Type[Address]) \
+        -> Iterator[Tuple[int, List[str], Type[Address]]]:
+    rows = iter(rows)
+    start = 0
+    while True:
+        lines = list(islice(rows, chunksize))
+        if len(lines) == 0:
+            return
+        yield start, lines, address_type
+        start += len(lines)
+
+
+def parse_addresses(rows: Iterable[str],
+                    address_type: Type[Address] = GermanAddress,
+                    processes: Optional[int] = None,
+                    chunksize: int = 10000,
+                    progress: Optional[Callable[[int],None]] = None) \
+        -> AddressBatchResult:
+    """
+    Parse an iterable of address strings.
+
+    Rows that cannot be parsed do not stop the parsing but are reported
+    as structured errors in the result. Empty rows are skipped. If
+    `processes` is given and larger than one, chunks of `chunksize`
+    rows are parsed in a pool of that many processes. The optional
+    `progress` callback receives the number of rows processed so far.
+    """
+    t0 = perf_counter()
+    addresses = []
+    errors = []
+    nrows = 0
+
+    def collect(results):
+        nonlocal nrows
+        for parsed, failed, end in results:
+            addresses.extend(parsed)
+            errors.extend(failed)
+            nrows = end
+            if progress is not None:
+                progress(nrows)
+
+    chunks = _chunks(rows, chunksize, address_type)
+    if processes is not None and processes > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            collect(pool.map(_parse_chunk, chunks))
+    else:
+        collect(map(_parse_chunk, chunks))
+
+    return AddressBatchResult(addresses, errors, nrows, perf_counter() - t0)
+
+
+def parse_address_file(path: Union[str, Path],
+                       address_type: Type[Address] = GermanAddress,
+                       processes: Optional[int] = None,
+                       chunksize: int = 10000,
+                       progress: Optional[Callable[[int],None]] = None,
+                       encoding: str = "utf-8") -> AddressBatchResult:
+    """
+    Parse a file containing one address per line.
+
+    Row indices in the result are zero-based line numbers.
+    """
+    with open(path, 'r', encoding=encoding) as f:
+        return parse_addresses((line.rstrip("\r\n") for line in f),
+                               address_type=address_type,
+                               processes=processes, chunksize=chunksize,
+                               progress=progress)
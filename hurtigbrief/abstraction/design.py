@@ -17,8 +17,29 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+from typing import Literal
+from .fingerprint import fingerprint_fields
+
+BodyFormat = Literal["latex", "markdown"]
+BODY_FORMATS = ("latex", "markdown")
+
 class Design:
     """
     A class representing a letter design.
     """
     font: str = "Crimson"
+    body_format: BodyFormat = "latex"
+
+    def __init__(self, font: str = "Crimson",
+                 body_format: BodyFormat = "latex"):
+        if body_format not in BODY_FORMATS:
+            raise ValueError("Unknown body format '" + str(body_format)
+                             + "'.")
+        self.font = str(font)
+        self.body_format = body_format
+
+    def fingerprint(self) -> bytes:
+        """
+        A content fingerprint that is stable across processes.
+        """
+        return fingerprint_fields("Design", self.font, self.body_format)
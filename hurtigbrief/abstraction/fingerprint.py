@@ -0,0 +1,76 @@
+# Stable content fingerprints.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from hashlib import blake2b
+from typing import Union
+
+#
+# The canonical serialization of a sequence of fields is a concatenation
+# of type-tagged, length-prefixed encodings of the fields. In contrast to
+# Python's `hash`, the resulting fingerprints are identical across
+# processes and sessions and can hence key on-disk caches or be used to
+# deduplicate across runs.
+#
+# Bump this version whenever the serialization of any type changes:
+FINGERPRINT_VERSION = 1
+
+# Size of the fingerprints in bytes:
+FINGERPRINT_SIZE = 32
+
+Field = Union[None, bool, int, str, bytes]
+
+
+def _encode_length(n: int) -> bytes:
+    return n.to_bytes(8, "big")
+
+
+def canonical_field(value: Field) -> bytes:
+    """
+    Canonical serialization of a single field.
+    """
+    if value is None:
+        return b"N"
+    if isinstance(value, bool):
+        return b"T" if value else b"F"
+    if isinstance(value, int):
+        data = str(value).encode()
+        return b"I" + _encode_length(len(data)) + data
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        return b"S" + _encode_length(len(data)) + data
+    if isinstance(value, bytes):
+        return b"B" + _encode_length(len(value)) + value
+    raise TypeError("Cannot canonically serialize a field of type "
+                    + str(type(value)) + ".")
+
+
+def fingerprint_fields(tag: str, *fields: Field) -> bytes:
+    """
+    Fingerprint of a tagged sequence of fields.
+
+    Fingerprints of other objects can be passed as (bytes) fields, which
+    allows composing fingerprints from cached sub-fingerprints.
+    """
+    h = blake2b(digest_size=FINGERPRINT_SIZE,
+                person=b"hurtigbrief-v" + str(FINGERPRINT_VERSION).encode())
+    h.update(canonical_field(tag))
+    h.update(_encode_length(len(fields)))
+    for field in fields:
+        h.update(canonical_field(field))
+    return h.digest()
@@ -18,12 +18,18 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from .person import Person
+from .fingerprint import fingerprint_fields
 from typing import Optional
 
 class Letter:
     """
     A letter.
+
+    Letters are immutable values: they compare equal if their content
+    is equal, and their hash is computed only once.
     """
+    __slots__ = ("sender", "destination", "subject", "opening", "body",
+                 "closing", "signature", "_hash", "_fingerprint")
     sender: Person
     destination: Person
     subject: str
@@ -37,10 +43,54 @@ class Letter:
                  signature: Optional[str]):
         assert isinstance(sender, Person)
         assert isinstance(destination, Person)
-        self.sender = sender
-        self.destination = destination
-        self.subject = str(subject)
-        self.opening = str(opening)
-        self.body = str(body)
-        self.closing = str(closing)
-        self.signature = str(signature) if signature is not None else None
+        _set = object.__setattr__
+        _set(self, "sender", sender)
+        _set(self, "destination", destination)
+        _set(self, "subject", str(subject))
+        _set(self, "opening", str(opening))
+        _set(self, "body", str(body))
+        _set(self, "closing", str(closing))
+        _set(self, "signature",
+             str(signature) if signature is not None else None)
+        _set(self, "_hash", None)
+        _set(self, "_fingerprint", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("'Letter' is immutable.")
+
+    def __delattr__(self, name):
+        raise AttributeError("'Letter' is immutable.")
+
+    def _key(self) -> tuple:
+        return (self.sender, self.destination, self.subject, self.opening,
+                self.body, self.closing, self.signature)
+
+    def __hash__(self):
+        h = self._hash
+        if h is None:
+            h = hash(self._key())
+            object.__setattr__(self, "_hash", h)
+        return h
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Letter):
+            return NotImplemented
+        return hash(self) == hash(other) and self._key() == other._key()
+
+    def __reduce__(self):
+        return (Letter, self._key())
+
+    def fingerprint(self) -> bytes:
+        """
+        A content fingerprint that is stable across processes.
+        """
+        fp = self._fingerprint
+        if fp is None:
+            fp = fingerprint_fields("Letter", self.sender.fingerprint(),
+                                    self.destination.fingerprint(),
+                                    self.subject, self.opening, self.body,
+                                    self.closing, self.signature)
+            object.__setattr__(self, "_fingerprint", fp)
+        return fp
@@ -18,18 +18,25 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from .address import Address
+from .fingerprint import fingerprint_fields
 from typing import Optional, List
 
 
 class Person:
     """
     A juridicial person.
+
+    Persons are immutable values: they compare equal if their content
+    is equal, and their hash and composed address are computed only once.
     """
+    __slots__ = ("name", "address", "email", "phone", "_hash",
+                 "_composed_address", "_fingerprint")
+
     # Attributes:
     name: str
     address: Address
-    email: Optional[str] = None
-    phone: Optional[str] = None
+    email: Optional[str]
+    phone: Optional[str]
 
 
     def __init__(self, name: str, address: Address,
@@ -37,8 +44,9 @@ class Person:
                  phone: Optional[str] = None):
         if not isinstance(address, Address):
             raise TypeError("`address` has to be an `Address` instance.")
-        self.name = str(name)
-        self.address = address
+        _set = object.__setattr__
+        _set(self, "name", str(name))
+        _set(self, "address", address)
         # Ensure that None and "" map to None:
         if email is not None:
             email = str(email)
@@ -48,19 +56,65 @@ class Person:
             phone = str(phone)
             if len(phone) == 0:
                 phone = None
-        self.email = email
-        self.phone = phone
+        _set(self, "email", email)
+        _set(self, "phone", phone)
+        _set(self, "_hash", None)
+        _set(self, "_composed_address", None)
+        _set(self, "_fingerprint", None)
+
+
+    def __setattr__(self, name, value):
+        raise AttributeError("'Person' is immutable.")
+
+
+    def __delattr__(self, name):
+        raise AttributeError("'Person' is immutable.")
 
 
     def __hash__(self):
-        return hash((self.name, self.address, self.email, self.phone))
+        h = self._hash
+        if h is None:
+            h = hash((self.name, self.address, self.email, self.phone))
+            object.__setattr__(self, "_hash", h)
+        return h
+
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Person):
+            return NotImplemented
+        return (hash(self) == hash(other) and self.name == other.name
+                and self.address == other.address
+                and self.email == other.email and self.phone == other.phone)
+
+
+    def __reduce__(self):
+        return (Person, (self.name, self.address, self.email, self.phone))
+
+
+    def fingerprint(self) -> bytes:
+        """
+        A content fingerprint that is stable across processes.
+        """
+        fp = self._fingerprint
+        if fp is None:
+            fp = fingerprint_fields("Person", self.name,
+                                    self.address.fingerprint(), self.email,
+                                    self.phone)
+            object.__setattr__(self, "_fingerprint", fp)
+        return fp
 
 
     def compose_address(self) -> str:
         """
         Compose an address.
         """
-        return "\\\\".join([self.name] + self.address.compose())
+        composed = self._composed_address
+        if composed is None:
+            composed = "\\\\".join([self.name] + self.address.compose())
+            object.__setattr__(self, "_composed_address", composed)
+        return composed
 
 
     @staticmethod
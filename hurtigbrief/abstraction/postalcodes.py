@@ -0,0 +1,203 @@
+# A compact index of postal codes and cities.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from threading import Lock
+from typing import Iterable, List, Optional, Tuple, Union
+from .address import GermanAddress
+
+# The file name of the postal code data, in the user data directory:
+POSTAL_CODE_FILE = "postalcodes.tsv"
+
+
+class PostalCodeIndex:
+    """
+    An index of (postal code, city) pairs that supports prefix lookup
+    from postal code to city and from city to postal code.
+
+    The index is stored in sorted arrays: postal codes and city numbers
+    sorted by postal code, and postal codes sorted by case-folded city
+    name. Lookups are binary searches.
+    """
+    def __init__(self, entries: Iterable[Tuple[int, str]]):
+        pairs = sorted(set((int(plz), str(city).strip())
+                           for plz, city in entries))
+
+        # Unique cities, sorted by their folded names:
+        cities = sorted(set(city for _, city in pairs),
+                        key=lambda c: (c.casefold(), c))
+        city_id = {city : i for i, city in enumerate(cities)}
+        self.cities = cities
+        self.city_keys = [c.casefold() for c in cities]
+
+        # Postal code -> city:
+        self.plz = array('I', (plz for plz, _ in pairs))
+        self.plz_city = array('I', (city_id[city] for _, city in pairs))
+
+        # City -> postal codes. For city number i, the postal codes are
+        # city_plz[city_start[i]:city_start[i+1]]:
+        by_city = sorted((city_id[city], plz) for plz, city in pairs)
+        self.city_plz = array('I', (plz for _, plz in by_city))
+        city_start = array('I', [0] * (len(cities) + 1))
+        for cid, _ in by_city:
+            city_start[cid+1] += 1
+        for i in range(len(cities)):
+            city_start[i+1] += city_start[i]
+        self.city_start = city_start
+
+    def __len__(self) -> int:
+        return len(self.plz)
+
+    @staticmethod
+    def load(path: Union[str, Path]) -> "PostalCodeIndex":
+        """
+        Load the index from a tab-separated file with one
+        "POSTAL CODE<TAB>CITY" entry per line.
+        """
+        def entries():
+            with open(path, 'r', encoding="utf-8") as f:
+                for line in f:
+                    line = line.rstrip("\r\n")
+                    if len(line) == 0 or line.startswith("#"):
+                        continue
+                    plz, _, city = line.partition("\t")
+                    if not plz.strip().isdigit() or len(city.strip()) == 0:
+                        continue
+                    yield int(plz), city
+        return PostalCodeIndex(entries())
+
+    def _plz_range(self, lo: int, hi: int) -> Tuple[int,int]:
+        return bisect_left(self.plz, lo), bisect_left(self.plz, hi)
+
+    def cities_for_postal_code(self, plz: int) -> List[str]:
+        """
+        All cities with a postal code.
+        """
+        i0, i1 = self._plz_range(int(plz), int(plz) + 1)
+        return [self.cities[self.plz_city[i]] for i in range(i0, i1)]
+
+    def postal_codes_for_city(self, city: str) -> List[int]:
+        """
+        All postal codes of a city.
+        """
+        key = city.strip().casefold()
+        codes = []
+        i = bisect_left(self.city_keys, key)
+        while i < len(self.city_keys) and self.city_keys[i] == key:
+            codes.extend(self.city_plz[self.city_start[i]:
+                                       self.city_start[i+1]])
+            i += 1
+        return codes
+
+    def complete_postal_code(self, prefix: str, limit: int = 10,
+                             digits: int = 5) -> List[Tuple[int, str]]:
+        """
+        The (postal code, city) pairs whose postal code starts with
+        `prefix`.
+        """
+        prefix = prefix.strip()
+        if not prefix.isdigit() or len(prefix) > digits:
+            return []
+        scale = 10 ** (digits - len(prefix))
+        i0, i1 = self._plz_range(int(prefix) * scale,
+                                 (int(prefix) + 1) * scale)
+        i1 = min(i1, i0 + limit)
+        return [(self.plz[i], self.cities[self.plz_city[i]])
+                for i in range(i0, i1)]
+
+    def complete_city(self, prefix: str, limit: int = 10) \
+            -> List[Tuple[int, str]]:
+        """
+        The (postal code, city) pairs whose city starts with `prefix`.
+        """
+        key = prefix.strip().casefold()
+        completions = []
+        i = bisect_left(self.city_keys, key)
+        while i < len(self.city_keys) and len(completions) < limit \
+                and self.city_keys[i].startswith(key):
+            city = self.cities[i]
+            for j in range(self.city_start[i], self.city_start[i+1]):
+                completions.append((self.city_plz[j], city))
+                if len(completions) == limit:
+                    break
+            i += 1
+        return completions
+
+    def validate(self, address: GermanAddress) -> Optional[str]:
+        """
+        Validate the postal code and city of an address. Returns None if
+        the address is valid, and otherwise a description of the problem.
+        """
+        cities = self.cities_for_postal_code(address.postalcode)
+        if len(cities) == 0:
+            return "Unknown postal code " + str(address.postalcode) + "."
+        city = address.city.casefold()
+        if not any(c.casefold() == city for c in cities):
+            return "The postal code " + str(address.postalcode) \
+                   + " belongs to " + " or ".join(cities) + ", not to " \
+                   + address.city + "."
+        return None
+
+
+#
+# The index is loaded lazily on first use:
+#
+_index_lock = Lock()
+_index_loaded = False
+_index: Optional[PostalCodeIndex] = None
+
+
+def postal_code_file() -> Path:
+    """
+    The location of the postal code data file.
+    """
+    from appdirs import user_data_dir
+    return Path(user_data_dir("hurtigbrief","mjz")) / POSTAL_CODE_FILE
+
+
+def postal_code_index() -> Optional[PostalCodeIndex]:
+    """
+    The postal code index, or None if no postal code data is available.
+    """
+    global _index, _index_loaded
+    if _index_loaded:
+        return _index
+    with _index_lock:
+        if not _index_loaded:
+            path = postal_code_file()
+            if path.is_file():
+                _index = PostalCodeIndex.load(path)
+            _index_loaded = True
+    return _index
+
+
+def validate_address(address: GermanAddress) -> Optional[str]:
+    """
+    Validate an address against the postal code index, if available.
+    Returns None if the address is valid or cannot be checked, and
+    otherwise a description of the problem.
+    """
+    if address.plz_only and address.postalcode == 0:
+        return None
+    index = postal_code_index()
+    if index is None:
+        return None
+    return index.validate(address)
@@ -0,0 +1,31 @@
+# The user cache directory.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from pathlib import Path
+from appdirs import user_cache_dir
+
+
+def cache_directory() -> Path:
+    """
+    The directory in which Hurtigbrief caches data between sessions.
+    The directory is created if it does not exist.
+    """
+    cachedir = Path(user_cache_dir("hurtigbrief","mjz"))
+    cachedir.mkdir(parents=True, exist_ok=True)
+    return cachedir
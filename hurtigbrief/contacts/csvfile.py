@@ -0,0 +1,87 @@
+# Contact import and export in the CSV format.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import csv
+from typing import IO, Iterable, Iterator, Union
+from ..abstraction.address import GermanAddress
+from ..abstraction.person import Person
+from .records import ContactRecordError
+
+# The columns of exported CSV files:
+CSV_COLUMNS = ["name", "street", "number", "postalcode", "city", "email",
+               "phone"]
+
+
+def read_csv(f: IO[str]) -> Iterator[Union[Person, ContactRecordError]]:
+    """
+    Read people from a CSV text stream row by row, yielding a `Person`
+    for each row or a `ContactRecordError` if the row cannot be converted.
+
+    The first row names the columns. Besides the columns written by
+    `write_csv`, a single "address" column in the format accepted by
+    `GermanAddress.parse_address` is understood.
+    """
+    reader = csv.DictReader(f)
+    if reader.fieldnames is None:
+        return
+    fields = {name.strip().casefold() : name for name in reader.fieldnames}
+    def column(row: dict, name: str) -> str:
+        if name not in fields:
+            return ""
+        return (row[fields[name]] or "").strip()
+
+    for record, row in enumerate(reader):
+        name = column(row, "name")
+        if len(name) == 0:
+            yield ContactRecordError(record, "", "Contact without a name.")
+            continue
+        if "address" in fields:
+            address = column(row, "address")
+        else:
+            address = " ".join(x for x in (column(row, "street"),
+                                           column(row, "number")) if x) \
+                      + ", " + column(row, "postalcode") + " " \
+                      + column(row, "city")
+        try:
+            address = GermanAddress.parse_address(address)
+        except ValueError as e:
+            yield ContactRecordError(record, name, str(e))
+            continue
+        yield Person(name, address, column(row, "email"),
+                     column(row, "phone"))
+
+
+def write_csv(people: Iterable[Person], f: IO[str]):
+    """
+    Write people to a CSV text stream row by row.
+    """
+    writer = csv.writer(f)
+    writer.writerow(CSV_COLUMNS)
+    for person in people:
+        address = person.address
+        plz_only = isinstance(address, GermanAddress) and address.plz_only
+        writer.writerow([
+            person.name,
+            "" if plz_only else address.street,
+            "" if plz_only or address.number is None else address.number,
+            "{:05d}".format(address.postalcode),
+            address.city,
+            person.email or "",
+            person.phone or ""
+        ])
@@ -0,0 +1,145 @@
+# Streaming import and export of contacts.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Union
+from ..abstraction.person import Person
+from .store import ContactStore
+from .records import ContactRecordError
+from .vcard import read_vcards, write_vcards
+from .csvfile import read_csv, write_csv
+
+# File suffixes of the supported formats:
+VCARD_SUFFIXES = (".vcf", ".vcard")
+CSV_SUFFIXES = (".csv",)
+
+
+class ImportProgress:
+    """
+    Progress of a contact import.
+    """
+    records: int
+    imported: int
+    duplicates: int
+    errors: List[ContactRecordError]
+    error_count: int
+    fraction: Optional[float]
+    done: bool
+
+    def __init__(self):
+        self.records = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.errors = []
+        self.error_count = 0
+        self.fraction = None
+        self.done = False
+
+    def __repr__(self) -> str:
+        return "ImportProgress(records=" + str(self.records) \
+               + ", imported=" + str(self.imported) \
+               + ", duplicates=" + str(self.duplicates) \
+               + ", errors=" + str(self.error_count) + ")"
+
+
+def import_contacts(store: ContactStore,
+                    records: Iterable[Union[Person, ContactRecordError]],
+                    batch: int = 1000, max_errors: int = 1000,
+                    progress: Optional[ImportProgress] = None
+    ) -> Iterator[ImportProgress]:
+    """
+    Import people into a contact store, yielding the progress after each
+    batch of records. People already in the store are skipped.
+
+    Each batch is committed to the store, including changes that were
+    pending before the import. Only the first `max_errors` errors are
+    kept so that the memory stays bounded for arbitrarily large files.
+    """
+    if batch < 1:
+        raise ValueError("Batch size has to be positive.")
+    if progress is None:
+        progress = ImportProgress()
+    pending = 0
+    for record in records:
+        progress.records += 1
+        if isinstance(record, ContactRecordError):
+            progress.error_count += 1
+            if len(progress.errors) < max_errors:
+                progress.errors.append(record)
+        elif store.person_index(record) is not None:
+            progress.duplicates += 1
+        else:
+            # The batches are committed, so the imported people need
+            # not be journaled:
+            with store.journal_suspended():
+                store.set_person(store.person_count(), record)
+            progress.imported += 1
+        pending += 1
+        if pending == batch:
+            store.commit()
+            pending = 0
+            yield progress
+    store.commit()
+    progress.done = True
+    yield progress
+
+
+def import_file(store: ContactStore, path: Union[str, Path],
+                batch: int = 1000, max_errors: int = 1000,
+                encoding: str = "utf-8") -> Iterator[ImportProgress]:
+    """
+    Import a vCard or CSV file into a contact store, yielding the
+    progress after each batch of records. The format is determined by
+    the file suffix.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix in VCARD_SUFFIXES:
+        reader = read_vcards
+    elif suffix in CSV_SUFFIXES:
+        reader = read_csv
+    else:
+        raise ValueError("Unknown contact file format '" + path.suffix + "'.")
+    size = path.stat().st_size
+    progress = ImportProgress()
+    with open(path, 'r', encoding=encoding, newline='') as f:
+        for progress in import_contacts(store, reader(f), batch, max_errors,
+                                        progress):
+            # The position of the underlying binary stream:
+            if size > 0:
+                progress.fraction = min(f.buffer.tell() / size, 1.0)
+            yield progress
+
+
+def export_file(store: ContactStore, path: Union[str, Path],
+                vcard_version: str = "3.0", encoding: str = "utf-8"):
+    """
+    Export all people of a contact store to a vCard or CSV file. The
+    format is determined by the file suffix.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        if suffix in VCARD_SUFFIXES:
+            write_vcards(store.iter_people(), f, vcard_version)
+        elif suffix in CSV_SUFFIXES:
+            write_csv(store.iter_people(), f)
+        else:
+            raise ValueError("Unknown contact file format '"
+                             + path.suffix + "'.")
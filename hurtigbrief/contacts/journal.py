@@ -0,0 +1,119 @@
+# Append-only journal of contact edits.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import struct
+import marshal
+from zlib import crc32
+from pathlib import Path
+from typing import Iterator, Tuple, Union
+
+# Record header: payload length and CRC-32 of the payload.
+_HEADER = struct.Struct("<II")
+
+# Synchronize only the file data if the platform allows it:
+_sync = getattr(os, "fdatasync", os.fsync)
+
+
+class ContactJournal:
+    """
+    An append-only journal of contact edits.
+
+    Each record is a tuple of plain values that is appended as a
+    length-prefixed, checksummed record and synchronized to disk, so
+    that each edit is durable at the cost of a single small write.
+    A record that was torn by a crash ends the journal.
+    """
+    path: Path
+    sync: bool
+
+    def __init__(self, path: Union[str, Path], sync: bool = True):
+        self.path = Path(path)
+        self.sync = sync
+        # Drop a torn record at the end before appending:
+        end = 0
+        for end, _ in self._scan():
+            pass
+        self.file = open(self.path, "ab")
+        if self.file.tell() != end:
+            self.file.truncate(end)
+            self.file.seek(end)
+
+    def _scan(self) -> Iterator[Tuple[int, tuple]]:
+        """
+        Yield the offset after each valid record and the record.
+        """
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            offset = 0
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    return
+                length, checksum = _HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or crc32(payload) != checksum:
+                    return
+                try:
+                    record = marshal.loads(payload)
+                except (EOFError, ValueError, TypeError):
+                    return
+                offset += _HEADER.size + length
+                yield offset, record
+
+    def __iter__(self) -> Iterator[tuple]:
+        """
+        Iterate the records in the order they were appended.
+        """
+        self.file.flush()
+        for _, record in self._scan():
+            yield record
+
+    @property
+    def size(self) -> int:
+        """
+        Size of the journal in bytes.
+        """
+        return self.file.tell()
+
+    def append(self, record: tuple):
+        """
+        Append a record and synchronize it to disk.
+        """
+        payload = marshal.dumps(record)
+        self.file.write(_HEADER.pack(len(payload), crc32(payload)) + payload)
+        self.file.flush()
+        if self.sync:
+            _sync(self.file.fileno())
+
+    def truncate(self):
+        """
+        Remove all records, e.g. after they have been written to the
+        contact store.
+        """
+        self.file.seek(0)
+        self.file.truncate()
+        if self.sync:
+            _sync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
@@ -1,4 +1,4 @@
-# Notification from finished threads.
+# Records of contact imports.
 #
 # Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
 #
@@ -17,23 +17,20 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from .gtk import GObject
 
-class Notify(GObject.GObject):
+class ContactRecordError:
     """
-    A class to notify, from a different Python thread, the main
-    application about the completion and result of a task.
+    A record of a contact file that could not be imported.
     """
-    __gsignals__ = {
-        "notify_result" : (GObject.SIGNAL_RUN_FIRST, None, (object,)),
-        "notify_compile_time" : (GObject.SIGNAL_RUN_FIRST, None, (object,))
-    }
+    record: int
+    name: str
+    message: str
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, record: int, name: str, message: str):
+        self.record = int(record)
+        self.name = str(name)
+        self.message = str(message)
 
-    def emit_result(self, result):
-        self.emit("notify_result", result)
-
-    def emit_compile_time(self, compile_time: float):
-        self.emit("notify_compile_time", compile_time)
+    def __repr__(self) -> str:
+        return "ContactRecordError(" + str(self.record) + ", " \
+               + repr(self.name) + ", " + repr(self.message) + ")"
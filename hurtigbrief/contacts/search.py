@@ -0,0 +1,224 @@
+# A fuzzy search index over contacts.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import re
+import unicodedata
+from heapq import nlargest
+from bisect import bisect_left, insort
+from operator import itemgetter
+from functools import lru_cache
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from ..abstraction.person import Person
+
+
+# The blocks of combining diacritical marks:
+_DIACRITICS = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff"
+                         "\u20d0-\u20ff\ufe20-\ufe2f]")
+
+
+def normalize(text: str) -> str:
+    """
+    Case-fold a text and strip its diacritics.
+    """
+    text = text.casefold()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize("NFKD", text)
+    if text.isascii():
+        return text
+    return _DIACRITICS.sub("", text)
+
+
+@lru_cache(maxsize=65536)
+def _word_trigrams(padded: str) -> FrozenSet[str]:
+    return frozenset(map("".join, zip(padded, padded[1:], padded[2:])))
+
+
+def trigrams(text: str, complete: bool = True) -> FrozenSet[str]:
+    """
+    The trigrams of the words of a normalized text. Words are padded with
+    a space on both sides so that word beginnings and ends form trigrams
+    of their own. If `complete` is False, the last word is not padded at
+    its end since it might still be incomplete (e.g. while typing).
+    """
+    words = text.split()
+    grams = set()
+    for i, word in enumerate(words):
+        if complete or i + 1 < len(words):
+            grams.update(_word_trigrams(" " + word + " "))
+        else:
+            grams.update(_word_trigrams(" " + word))
+    return frozenset(grams)
+
+
+class ContactSearchIndex:
+    """
+    A trigram index over the name, city, and e-mail address of people.
+
+    The index is updated incrementally when people are added or changed.
+    Searches rank the people by the trigram similarity to the query,
+    favouring names that start with the query. Queries shorter than a
+    trigram are answered by a name prefix search.
+
+    Candidates are collected without scoring every person that shares a
+    trigram with the query: the names starting with the query are found
+    by bisection, and the people containing all trigrams of the query
+    by intersecting the posting lists smallest first, stopping once
+    enough candidates are found. Only if that yields fewer than the
+    requested number of matches (e.g. for misspelled queries) are the
+    people counted that share the rarer trigrams of the query.
+    """
+    postings: Dict[str, Set[int]]
+    entries: Dict[int, Tuple[str, FrozenSet[str]]]
+    names: List[Tuple[str, int]]
+
+    # Number of candidates, per requested match, that are ranked by their
+    # full similarity score:
+    CANDIDATES_PER_MATCH = 10
+
+    # Trigrams shared by more than this fraction of the people are not
+    # counted when searching for misspelled queries:
+    COMMON_TRIGRAM_FRACTION = 0.05
+
+    def __init__(self, people: Optional[Iterable[Person]] = None):
+        self.postings = dict()
+        self.entries = dict()
+        self.names = []
+        if people is not None:
+            for i, person in enumerate(people):
+                self.names.append((self._add_entry(i, person), i))
+            self.names.sort()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def _text(person: Person) -> str:
+        fields = [person.name, person.address.city]
+        if person.email is not None:
+            fields.append(person.email.replace("@", " ").replace(".", " "))
+        return " ".join(fields)
+
+    def add(self, idx: int, person: Person):
+        """
+        Add (or replace) the person with index `idx`.
+        """
+        if idx in self.entries:
+            self.remove(idx)
+        insort(self.names, (self._add_entry(idx, person), idx))
+
+    def _add_entry(self, idx: int, person: Person) -> str:
+        """
+        Add a person to the entries and postings, and return the
+        normalized name.
+        """
+        name = normalize(person.name)
+        grams = trigrams(normalize(self._text(person)))
+        self.entries[idx] = (name, grams)
+        postings = self.postings
+        for g in grams:
+            posting = postings.get(g)
+            if posting is None:
+                postings[g] = {idx}
+            else:
+                posting.add(idx)
+        return name
+
+    def update(self, idx: int, person: Person):
+        """
+        Update the person with index `idx`.
+        """
+        self.add(idx, person)
+
+    def remove(self, idx: int):
+        """
+        Remove the person with index `idx`.
+        """
+        entry = self.entries.pop(idx, None)
+        if entry is None:
+            return
+        i = bisect_left(self.names, (entry[0], idx))
+        del self.names[i]
+        for g in entry[1]:
+            posting = self.postings[g]
+            posting.discard(idx)
+            if len(posting) == 0:
+                del self.postings[g]
+
+    def _prefix_search(self, query: str, k: int) -> List[int]:
+        matches = []
+        i = bisect_left(self.names, (query, -1))
+        while i < len(self.names) and len(matches) < k \
+                and self.names[i][0].startswith(query):
+            matches.append(self.names[i][1])
+            i += 1
+        return matches
+
+    def search(self, query: str, k: int = 10) -> List[int]:
+        """
+        The indices of the (at most) `k` best matches for a query,
+        best match first.
+        """
+        query = " ".join(normalize(query).split())
+        qgrams = trigrams(query, complete=False)
+        if len(qgrams) == 0:
+            return self._prefix_search(query, k)
+
+        n_candidates = self.CANDIDATES_PER_MATCH * k
+        postings = sorted((self.postings[g] for g in qgrams
+                           if g in self.postings), key=len)
+        if len(postings) == 0:
+            return self._prefix_search(query, k)
+
+        # Names starting with the query:
+        candidates = set(self._prefix_search(query, n_candidates))
+
+        # People containing all trigrams of the query, found by probing
+        # the smallest posting list against the others:
+        smallest, others = postings[0], postings[1:]
+        for idx in smallest:
+            if len(candidates) >= n_candidates:
+                break
+            if all(idx in posting for posting in others):
+                candidates.add(idx)
+
+        # Misspelled queries: count the shared rare trigrams:
+        if len(candidates) < k:
+            shared = Counter()
+            max_posting = self.COMMON_TRIGRAM_FRACTION * len(self.entries)
+            for posting in postings:
+                if len(posting) > max_posting and len(shared) > 0:
+                    break
+                shared.update(posting)
+            candidates.update(idx for idx, _ in
+                              nlargest(n_candidates, shared.items(),
+                                       key=itemgetter(1)))
+
+        # Rank by Dice coefficient, with a bonus for name prefixes:
+        nq = len(qgrams)
+        entries = self.entries
+        def score(idx):
+            name, grams = entries[idx]
+            s = 2.0 * len(qgrams & grams) / (nq + len(grams))
+            if name.startswith(query):
+                s += 1.0
+            return (s, -idx)
+
+        return nlargest(k, candidates, key=score)
@@ -0,0 +1,561 @@
+# An SQLite-backed contact store.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import sqlite3
+from pathlib import Path
+from threading import RLock
+from contextlib import contextmanager
+from collections import OrderedDict
+from collections.abc import MutableSequence
+from typing import Iterator, List, Optional, Union
+from ..abstraction.address import Address, address_from_json
+from ..abstraction.person import Person
+from .journal import ContactJournal
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS addresses (
+    idx INTEGER PRIMARY KEY,
+    country TEXT NOT NULL,
+    street TEXT,
+    number TEXT,
+    postalcode INTEGER NOT NULL,
+    city TEXT NOT NULL COLLATE NOCASE,
+    fingerprint BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS addresses_fingerprint ON addresses(fingerprint);
+CREATE INDEX IF NOT EXISTS addresses_city ON addresses(city);
+CREATE INDEX IF NOT EXISTS addresses_postalcode ON addresses(postalcode);
+CREATE TABLE IF NOT EXISTS people (
+    idx INTEGER PRIMARY KEY,
+    name TEXT NOT NULL COLLATE NOCASE,
+    address INTEGER NOT NULL REFERENCES addresses(idx),
+    email TEXT,
+    phone TEXT,
+    fingerprint BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS people_name ON people(name);
+CREATE INDEX IF NOT EXISTS people_address ON people(address);
+CREATE INDEX IF NOT EXISTS people_fingerprint ON people(fingerprint);
+"""
+
+# Number of addresses and people kept in memory:
+CACHE_SIZE = 4096
+
+# Size of the journal (in bytes) above which it is compacted into the
+# database:
+JOURNAL_COMPACT_SIZE = 1024 * 1024
+
+
+def _address_row(idx: int, address: Address) -> tuple:
+    json = address.to_json()
+    return (idx, json["country"], json.get("street"), json.get("number"),
+            json["postalcode"], json["city"], address.fingerprint())
+
+
+def _address_from_row(country: str, street: Optional[str],
+                      number: Optional[str], postalcode: int,
+                      city: str) -> Address:
+    json = {"country" : country, "postalcode" : postalcode, "city" : city}
+    if street is not None:
+        json["street"] = street
+        if number is not None:
+            json["number"] = number
+    return address_from_json(json)
+
+
+def _like_prefix(prefix: str) -> str:
+    return prefix.replace("\\", "\\\\").replace("%", "\\%")\
+                 .replace("_", "\\_") + "%"
+
+
+class ContactStore:
+    """
+    Addresses and people stored in an indexed SQLite database.
+
+    Addresses and people are identified by their zero-based index, as
+    in the lists of the JSON configuration, and are read from the
+    database on first access. Changes are written row by row within a
+    transaction that is only made permanent by `commit`.
+
+    If a journal is given, each change is also appended to the journal,
+    which makes it durable before it is committed. Changes left in the
+    journal (e.g. after a crash) are replayed when the store is opened,
+    and the journal is compacted into the database by committing once
+    it grows beyond `compact_size` bytes.
+    """
+    path: str
+    journal: Optional[ContactJournal]
+    compact_size: int
+
+    def __init__(self, path: Union[str, Path],
+                 journal: Optional[ContactJournal] = None,
+                 compact_size: int = JOURNAL_COMPACT_SIZE):
+        self.path = str(path)
+        self.lock = RLock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.lock:
+            self.connection.executescript(_SCHEMA)
+            self.connection.commit()
+        self._address_cache = OrderedDict()
+        self._person_cache = OrderedDict()
+        self.addresses = AddressList(self)
+        self.people = PersonList(self)
+        self.journal = journal
+        self.compact_size = int(compact_size)
+        self._journal_suspended = False
+        if journal is not None:
+            self._replay(journal)
+            if journal.size > self.compact_size:
+                self.commit()
+
+    def close(self):
+        """
+        Close the database, discarding uncommitted changes (but keeping
+        them in the journal).
+        """
+        with self.lock:
+            self.connection.close()
+            if self.journal is not None:
+                self.journal.close()
+
+    def commit(self):
+        """
+        Make all changes since the last commit permanent.
+        """
+        with self.lock:
+            self.connection.commit()
+            if self.journal is not None:
+                self.journal.truncate()
+
+    def rollback(self):
+        """
+        Discard all changes since the last commit.
+        """
+        with self.lock:
+            self.connection.rollback()
+            if self.journal is not None:
+                self.journal.truncate()
+            self._address_cache.clear()
+            self._person_cache.clear()
+
+    #
+    # The journal:
+    #
+    def _log(self, record: tuple):
+        """
+        Append a change to the journal, compacting it if it has grown
+        too large.
+        """
+        if self.journal is None or self._journal_suspended:
+            return
+        self.journal.append(record)
+        if self.journal.size > self.compact_size:
+            self.commit()
+
+    def _replay(self, journal: ContactJournal):
+        """
+        Apply the changes recorded in a journal.
+        """
+        with self.lock:
+            for record in journal:
+                if record[0] == "address":
+                    idx = record[1]
+                    address = _address_from_row(*record[2:])
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO addresses (idx, country, "
+                        "street, number, postalcode, city, fingerprint) "
+                        "VALUES (?,?,?,?,?,?,?)",
+                        _address_row(idx, address)
+                    )
+                elif record[0] == "person":
+                    idx, name, address, email, phone = record[1:]
+                    person = Person(name, self.get_address(address), email,
+                                    phone)
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO people (idx, name, address, "
+                        "email, phone, fingerprint) VALUES (?,?,?,?,?,?)",
+                        (idx, name, address, email, phone,
+                         person.fingerprint())
+                    )
+                elif record[0] == "meta":
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) "
+                        "VALUES (?, ?)", record[1:]
+                    )
+                else:
+                    raise RuntimeError("Unknown contact journal record '"
+                                       + str(record[0]) + "'.")
+            self._address_cache.clear()
+            self._person_cache.clear()
+
+    @contextmanager
+    def journal_suspended(self):
+        """
+        Do not journal the changes within this context, e.g. for bulk
+        changes that are committed in batches anyway.
+        """
+        suspended = self._journal_suspended
+        self._journal_suspended = True
+        try:
+            yield self
+        finally:
+            self._journal_suspended = suspended
+
+    @property
+    def dirty(self) -> bool:
+        """
+        Whether there are uncommitted changes.
+        """
+        return self.connection.in_transaction
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> list:
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    @staticmethod
+    def _cache(cache: OrderedDict, key: int, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > CACHE_SIZE:
+            cache.popitem(last=False)
+
+    #
+    # The default sender:
+    #
+    @property
+    def default_sender(self) -> Optional[int]:
+        rows = self._execute("SELECT value FROM meta "
+                             "WHERE key = 'default_sender'")
+        if len(rows) == 0 or rows[0][0] is None:
+            return None
+        return int(rows[0][0])
+
+    @default_sender.setter
+    def default_sender(self, default_sender: Optional[int]):
+        if default_sender == self.default_sender:
+            return
+        value = str(int(default_sender)) if default_sender is not None \
+                else None
+        with self.lock:
+            self._execute("INSERT OR REPLACE INTO meta (key, value) "
+                          "VALUES ('default_sender', ?)", (value,))
+            self._log(("meta", "default_sender", value))
+
+    #
+    # Addresses:
+    #
+    def address_count(self) -> int:
+        # Indices are contiguous, and the maximum of the primary key
+        # is a cheap lookup in contrast to counting the rows:
+        return self._execute("SELECT COALESCE(MAX(idx) + 1, 0) "
+                             "FROM addresses")[0][0]
+
+    def get_address(self, idx: int) -> Address:
+        """
+        The address at index `idx`.
+        """
+        with self.lock:
+            address = self._address_cache.get(idx)
+            if address is not None:
+                return address
+            rows = self._execute("SELECT country, street, number, "
+                                 "postalcode, city FROM addresses "
+                                 "WHERE idx = ?", (idx,))
+            if len(rows) == 0:
+                raise IndexError("Address index " + str(idx)
+                                 + " out of range.")
+            address = _address_from_row(*rows[0])
+            self._cache(self._address_cache, idx, address)
+            return address
+
+    def set_address(self, idx: int, address: Address):
+        """
+        Set the address at index `idx`, which may be one past the last
+        index to append an address.
+        """
+        with self.lock:
+            if idx < 0 or idx > self.address_count():
+                raise IndexError("Address index " + str(idx)
+                                 + " out of range.")
+            row = _address_row(idx, address)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO addresses (idx, country, street, "
+                "number, postalcode, city, fingerprint) "
+                "VALUES (?,?,?,?,?,?,?)",
+                row
+            )
+            self._cache(self._address_cache, idx, address)
+            self._log(("address",) + row[:-1])
+
+    def address_index(self, address: Address) -> Optional[int]:
+        """
+        The index of an address, or None if it is not stored.
+        """
+        rows = self._execute("SELECT idx FROM addresses WHERE fingerprint = ? "
+                             "ORDER BY idx LIMIT 1", (address.fingerprint(),))
+        return rows[0][0] if len(rows) > 0 else None
+
+    def add_address(self, address: Address) -> int:
+        """
+        Return the index of an address, storing the address first if it
+        is not yet stored.
+        """
+        with self.lock:
+            idx = self.address_index(address)
+            if idx is None:
+                idx = self.address_count()
+                self.set_address(idx, address)
+            return idx
+
+    #
+    # People:
+    #
+    def person_count(self) -> int:
+        return self._execute("SELECT COALESCE(MAX(idx) + 1, 0) "
+                             "FROM people")[0][0]
+
+    def get_person(self, idx: int) -> Person:
+        """
+        The person at index `idx`.
+        """
+        with self.lock:
+            person = self._person_cache.get(idx)
+            if person is not None:
+                return person
+            rows = self._execute("SELECT name, address, email, phone "
+                                 "FROM people WHERE idx = ?", (idx,))
+            if len(rows) == 0:
+                raise IndexError("Person index " + str(idx)
+                                 + " out of range.")
+            name, address, email, phone = rows[0]
+            person = Person(name, self.get_address(address), email, phone)
+            self._cache(self._person_cache, idx, person)
+            return person
+
+    def set_person(self, idx: int, person: Person):
+        """
+        Set the person at index `idx`, which may be one past the last
+        index to append a person. The person's address is stored if it
+        is not yet known.
+        """
+        with self.lock:
+            if idx < 0 or idx > self.person_count():
+                raise IndexError("Person index " + str(idx)
+                                 + " out of range.")
+            address = self.add_address(person.address)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO people (idx, name, address, email, "
+                "phone, fingerprint) VALUES (?,?,?,?,?,?)",
+                (idx, person.name, address, person.email, person.phone,
+                 person.fingerprint())
+            )
+            self._cache(self._person_cache, idx, person)
+            self._log(("person", idx, person.name, address, person.email,
+                       person.phone))
+
+    def person_index(self, person: Person) -> Optional[int]:
+        """
+        The index of a person, or None if the person is not stored.
+        """
+        rows = self._execute("SELECT idx FROM people WHERE fingerprint = ? "
+                             "ORDER BY idx LIMIT 1", (person.fingerprint(),))
+        return rows[0][0] if len(rows) > 0 else None
+
+    def person_names(self) -> List[str]:
+        """
+        The names of all people in order.
+        """
+        return [row[0] for row in
+                self._execute("SELECT name FROM people ORDER BY idx")]
+
+    def iter_people(self, batch: int = 1000) -> Iterator[Person]:
+        """
+        Iterate all people in order, reading them in batches.
+        """
+        last = -1
+        while True:
+            rows = self._execute(
+                "SELECT p.idx, p.name, p.email, p.phone, p.address, "
+                "a.country, a.street, a.number, a.postalcode, a.city "
+                "FROM people p JOIN addresses a ON p.address = a.idx "
+                "WHERE p.idx > ? ORDER BY p.idx LIMIT ?", (last, batch)
+            )
+            people = []
+            with self.lock:
+                for row in rows:
+                    person = self._person_cache.get(row[0])
+                    if person is None:
+                        address = self._address_cache.get(row[4])
+                        if address is None:
+                            address = _address_from_row(*row[5:])
+                        person = Person(row[1], address, row[2], row[3])
+                    people.append(person)
+            yield from people
+            if len(rows) < batch:
+                return
+            last = rows[-1][0]
+
+    def find_people(self, name: Optional[str] = None,
+                    city: Optional[str] = None,
+                    postalcode: Optional[int] = None,
+                    limit: Optional[int] = None) -> List[int]:
+        """
+        Indices of the people whose name and city start with the given
+        prefixes (case-insensitive) and who live at the given postal
+        code. Criteria that are None are not checked.
+        """
+        where = []
+        parameters = []
+        if name is not None:
+            where.append("p.name LIKE ? ESCAPE '\\'")
+            parameters.append(_like_prefix(name))
+        if city is not None:
+            where.append("a.city LIKE ? ESCAPE '\\'")
+            parameters.append(_like_prefix(city))
+        if postalcode is not None:
+            where.append("a.postalcode = ?")
+            parameters.append(int(postalcode))
+        sql = "SELECT p.idx FROM people p"
+        if city is not None or postalcode is not None:
+            sql += " JOIN addresses a ON p.address = a.idx"
+        if len(where) > 0:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY p.idx"
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(int(limit))
+        return [row[0] for row in self._execute(sql, tuple(parameters))]
+
+    #
+    # Migration:
+    #
+    def migrate_from_json(self, config: dict):
+        """
+        Import the contacts of the JSON configuration into an empty store
+        and commit them.
+        """
+        with self.lock:
+            if self.address_count() > 0 or self.person_count() > 0:
+                raise RuntimeError("Can only migrate into an empty contact "
+                                   "store.")
+            addresses = [address_from_json(json)
+                         for json in config.get("addresses", [])]
+            self.connection.executemany(
+                "INSERT INTO addresses (idx, country, street, number, "
+                "postalcode, city, fingerprint) VALUES (?,?,?,?,?,?,?)",
+                (_address_row(i, a) for i, a in enumerate(addresses))
+            )
+            def person_rows():
+                for i, json in enumerate(config.get("people", [])):
+                    p = Person.from_json(json, addresses)
+                    yield (i, p.name, int(json["address"]), p.email, p.phone,
+                           p.fingerprint())
+            self.connection.executemany(
+                "INSERT INTO people (idx, name, address, email, phone, "
+                "fingerprint) VALUES (?,?,?,?,?,?)",
+                person_rows()
+            )
+            self.default_sender = config.get("default_sender")
+            # Committing also truncates the journal, which the default
+            # sender has been logged to:
+            self.commit()
+
+
+class _StoreList(MutableSequence):
+    """
+    A list view of the addresses or people in a contact store.
+    Items cannot be deleted or inserted other than by appending.
+    """
+    def __init__(self, store: ContactStore):
+        self.store = store
+
+    def _normalize(self, i: int) -> int:
+        if isinstance(i, slice):
+            raise TypeError("Contact store lists do not support slicing.")
+        n = len(self)
+        if i < 0:
+            i += n
+        if i < 0 or i >= n:
+            raise IndexError("Index out of range.")
+        return i
+
+    def __delitem__(self, i):
+        raise TypeError("Contacts cannot be deleted.")
+
+    def insert(self, i: int, value):
+        if i != len(self):
+            raise TypeError("Contacts can only be appended.")
+        self.__setitem__(i, value, append=True)
+
+
+class AddressList(_StoreList):
+    """
+    The addresses of a contact store.
+    """
+    def __len__(self) -> int:
+        return self.store.address_count()
+
+    def __getitem__(self, i: int) -> Address:
+        return self.store.get_address(self._normalize(i))
+
+    def __setitem__(self, i: int, address: Address, append: bool = False):
+        self.store.set_address(i if append else self._normalize(i), address)
+
+    def __contains__(self, address) -> bool:
+        return isinstance(address, Address) \
+               and self.store.address_index(address) is not None
+
+    def index(self, address: Address, *args) -> int:
+        idx = self.store.address_index(address) \
+              if isinstance(address, Address) else None
+        if idx is None:
+            raise ValueError("Address not in contacts.")
+        return idx
+
+
+class PersonList(_StoreList):
+    """
+    The people of a contact store.
+    """
+    def __len__(self) -> int:
+        return self.store.person_count()
+
+    def __getitem__(self, i: int) -> Person:
+        return self.store.get_person(self._normalize(i))
+
+    def __setitem__(self, i: int, person: Person, append: bool = False):
+        self.store.set_person(i if append else self._normalize(i), person)
+
+    def __iter__(self) -> Iterator[Person]:
+        return self.store.iter_people()
+
+    def __contains__(self, person) -> bool:
+        return isinstance(person, Person) \
+               and self.store.person_index(person) is not None
+
+    def index(self, person: Person, *args) -> int:
+        idx = self.store.person_index(person) \
+              if isinstance(person, Person) else None
+        if idx is None:
+            raise ValueError("Person not in contacts.")
+        return idx
@@ -0,0 +1,207 @@
+# Contact import and export in the vCard format.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import IO, Iterable, Iterator, List, Union
+from ..abstraction.address import GermanAddress
+from ..abstraction.person import Person
+from .records import ContactRecordError
+
+# Country names of addresses that can be imported:
+GERMANY = {"", "germany", "deutschland", "de", "deu"}
+
+
+def _unescape(value: str) -> str:
+    out = []
+    i = 0
+    while i < len(value):
+        c = value[i]
+        if c == "\\" and i + 1 < len(value):
+            n = value[i+1]
+            out.append("\n" if n in "nN" else n)
+            i += 2
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+
+def _split_components(value: str, separator: str = ";") -> List[str]:
+    """
+    Split a structured value at unescaped separators and unescape the
+    components.
+    """
+    components = []
+    start = 0
+    i = 0
+    while i < len(value):
+        if value[i] == "\\":
+            i += 2
+            continue
+        if value[i] == separator:
+            components.append(_unescape(value[start:i]))
+            start = i + 1
+        i += 1
+    components.append(_unescape(value[start:]))
+    return components
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(",", "\\,")\
+                .replace(";", "\\;").replace("\n", "\\n")
+
+
+def _unfolded_lines(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Join folded content lines.
+    """
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None and len(current) > 0:
+        yield current
+
+
+def _split_property(line: str):
+    """
+    Split a content line into property name, parameters, and value.
+    """
+    # The value starts after the first colon outside of quotes:
+    quoted = False
+    for i, c in enumerate(line):
+        if c == '"':
+            quoted = not quoted
+        elif c == ":" and not quoted:
+            break
+    else:
+        return None, None, None
+    head, value = line[:i], line[i+1:]
+    parts = head.split(";")
+    # Strip a group prefix ("item1.ADR"):
+    name = parts[0].rpartition(".")[2].upper()
+    return name, parts[1:], value
+
+
+def _record_to_person(properties: dict, record: int) \
+        -> Union[Person, ContactRecordError]:
+    name = properties.get("FN")
+    if name is None and "N" in properties:
+        n = _split_components(properties["N"])
+        # Family; Given; Additional; Prefixes; Suffixes
+        name = " ".join(x for x in (n[3:4] + n[1:3] + n[:1] + n[4:5]) if x)
+    else:
+        name = _unescape(name) if name is not None else None
+    if not name:
+        return ContactRecordError(record, "", "Contact without a name.")
+    if "ADR" not in properties:
+        return ContactRecordError(record, name, "Contact without an address.")
+    adr = _split_components(properties["ADR"]) + [""] * 7
+    # PO box; extended; street; locality; region; postal code; country:
+    street, city, plz, country = adr[2], adr[3], adr[5], adr[6]
+    if country.strip().casefold() not in GERMANY:
+        return ContactRecordError(record, name, "Only addresses in Germany "
+                                  "can be imported.")
+    try:
+        address = GermanAddress.parse_address(
+            street.replace("\n", " ") + ", " + plz + " " + city
+        )
+    except ValueError as e:
+        return ContactRecordError(record, name, str(e))
+    email = properties.get("EMAIL")
+    phone = properties.get("TEL")
+    return Person(name, address,
+                  _unescape(email) if email is not None else None,
+                  _unescape(phone) if phone is not None else None)
+
+
+def read_vcards(f: IO[str]) -> Iterator[Union[Person, ContactRecordError]]:
+    """
+    Read vCard (version 3 or 4) records from a text stream one by one,
+    yielding a `Person` for each record or a `ContactRecordError` if the
+    record cannot be converted.
+    """
+    properties = None
+    record = 0
+    for line in _unfolded_lines(f):
+        name, _, value = _split_property(line)
+        if name is None:
+            continue
+        if name == "BEGIN" and value.strip().upper() == "VCARD":
+            properties = dict()
+        elif name == "END" and value.strip().upper() == "VCARD":
+            if properties is not None:
+                yield _record_to_person(properties, record)
+                record += 1
+            properties = None
+        elif properties is not None:
+            # Keep the first occurrence of each property:
+            properties.setdefault(name, value)
+
+
+def _fold(line: str) -> str:
+    """
+    Fold a content line to lines of at most 75 octets.
+    """
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    folded = []
+    limit = 75
+    while len(data) > limit:
+        # Do not split UTF-8 sequences:
+        cut = limit
+        while cut > 0 and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        folded.append(data[:cut].decode("utf-8"))
+        data = data[cut:]
+        limit = 74
+    folded.append(data.decode("utf-8"))
+    return "\r\n ".join(folded) + "\r\n"
+
+
+def write_vcards(people: Iterable[Person], f: IO[str],
+                 version: str = "3.0"):
+    """
+    Write people as vCard records to a text stream one by one.
+    """
+    if version not in ("3.0", "4.0"):
+        raise ValueError("Only vCard versions 3.0 and 4.0 are supported.")
+    for person in people:
+        address = person.address
+        lines = ["BEGIN:VCARD", "VERSION:" + version,
+                 "FN:" + _escape(person.name),
+                 "N:" + _escape(person.name) + ";;;;"]
+        street = ""
+        if isinstance(address, GermanAddress) and not address.plz_only:
+            street = address.street
+            if address.number is not None:
+                street += " " + address.number
+        lines.append("ADR:;;" + _escape(street) + ";" + _escape(address.city)
+                     + ";;{:05d};Germany".format(address.postalcode))
+        if person.email is not None:
+            lines.append("EMAIL:" + _escape(person.email))
+        if person.phone is not None:
+            lines.append("TEL:" + _escape(person.phone))
+        lines.append("END:VCARD")
+        f.write("".join(_fold(line) for line in lines))
@@ -0,0 +1,26 @@
+# The GUI-agnostic core: task loop and scheduling.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from .types import TemplateName
+from .task import LatexTask, TaskResult
+from .taskloop import TaskLoop, Job, Backend
+from .scheduler import Scheduler
+from .estimators import P2Quantile, CompileTimeEstimator
+from .schedulerstats import load_scheduler_stats, save_scheduler_stats
+from .latency import LatencyHistogram
@@ -0,0 +1,182 @@
+# Streaming estimators of compile times.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from bisect import insort
+from typing import List, Optional
+
+
+class P2Quantile:
+    """
+    Streaming estimate of a quantile in constant memory by the P²
+    algorithm, which tracks five markers whose heights are adjusted by
+    piecewise-parabolic interpolation.
+
+    Jain, R., Chlamtac, I.: The P² algorithm for dynamic calculation of
+    quantiles and histograms without storing observations
+    """
+    p: float
+    heights: List[float]
+    positions: List[float]
+    desired: List[float]
+    count: int
+
+    def __init__(self, p: float):
+        if p <= 0.0 or p >= 1.0:
+            raise ValueError("Quantile has to be in the open interval "
+                             "(0,1).")
+        self.p = p
+        self.heights = []
+        self.positions = [0.0, 1.0, 2.0, 3.0, 4.0]
+        self.desired = [0.0, 2*p, 4*p, 2.0 + 2*p, 4.0]
+        self.increments = [0.0, p / 2, p, (1.0 + p) / 2, 1.0]
+        self.count = 0
+
+    def add(self, x: float):
+        """
+        Add an observation.
+        """
+        self.count += 1
+        q = self.heights
+        if len(q) < 5:
+            insort(q, x)
+            return
+
+        # Find the cell of the observation and update the extremes:
+        n = self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k+1]:
+                k += 1
+        for i in range(k+1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Adjust the heights of the middle markers:
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1.0 and n[i+1] - n[i] > 1) \
+                    or (d <= -1.0 and n[i-1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = q[i] + d / (n[i+1] - n[i-1]) * (
+                    (n[i] - n[i-1] + d) * (q[i+1] - q[i]) / (n[i+1] - n[i])
+                    + (n[i+1] - n[i] - d) * (q[i] - q[i-1]) / (n[i] - n[i-1])
+                )
+                if q[i-1] < qp < q[i+1]:
+                    q[i] = qp
+                else:
+                    q[i] += d * (q[i+d] - q[i]) / (n[i+d] - n[i])
+                n[i] += d
+
+    def state(self) -> tuple:
+        """
+        The state of the sketch as a tuple of plain values.
+        """
+        return (self.p, self.count, tuple(self.heights),
+                tuple(self.positions))
+
+    @classmethod
+    def from_state(cls, state: tuple, decay: float = 1.0) -> "P2Quantile":
+        """
+        Restore a sketch from its state. With a `decay` below one, the
+        sketch counts as having seen proportionally fewer observations,
+        so that new observations move the markers faster.
+        """
+        p, count, heights, positions = state
+        sketch = cls(p)
+        sketch.heights = [float(h) for h in heights]
+        if len(sketch.heights) < 5:
+            sketch.count = len(sketch.heights)
+            return sketch
+        new_count = max(5, round(count * decay))
+        scale = (new_count - 1) / max(count - 1, 1)
+        n = [0.0] * 5
+        for i in range(1, 5):
+            n[i] = max(float(round(positions[i] * scale)), n[i-1] + 1.0)
+        sketch.positions = n
+        sketch.desired = [(n[4]) * d for d in sketch.increments]
+        sketch.count = int(n[4]) + 1
+        return sketch
+
+    def value(self) -> Optional[float]:
+        """
+        The estimated quantile, or None if nothing has been observed.
+        """
+        if len(self.heights) == 0:
+            return None
+        if self.count < 5:
+            return self.heights[round(self.p * (len(self.heights) - 1))]
+        return self.heights[2]
+
+
+class CompileTimeEstimator:
+    """
+    Streaming estimate of the compile time of one kind of compilation:
+    an exponentially weighted moving average that follows changes
+    quickly, and a quantile sketch of the tail.
+    """
+    alpha: float
+    mean: Optional[float]
+    count: int
+    sketch: P2Quantile
+
+    def __init__(self, alpha: float = 0.3, quantile: float = 0.9):
+        self.alpha = alpha
+        self.mean = None
+        self.count = 0
+        self.sketch = P2Quantile(quantile)
+
+    def add(self, T: float):
+        """
+        Add a compile time.
+        """
+        if self.mean is None:
+            self.mean = T
+        else:
+            self.mean += self.alpha * (T - self.mean)
+        self.count += 1
+        self.sketch.add(T)
+
+    def quantile(self) -> Optional[float]:
+        return self.sketch.value()
+
+    def state(self) -> tuple:
+        """
+        The state of the estimator as a tuple of plain values.
+        """
+        return (self.alpha, self.mean, self.count, self.sketch.state())
+
+    @classmethod
+    def from_state(cls, state: tuple, decay: float = 1.0) \
+            -> "CompileTimeEstimator":
+        """
+        Restore an estimator from its state, decaying its weight.
+        """
+        alpha, mean, count, sketch = state
+        estimator = cls(alpha)
+        estimator.mean = mean
+        estimator.count = round(count * decay)
+        estimator.sketch = P2Quantile.from_state(sketch, decay)
+        return estimator
@@ -0,0 +1,129 @@
+# A histogram of latencies with bounded relative error.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Dict, List, Optional, Tuple
+
+# Number of bits of the linear sub-buckets within each power of two. The
+# relative error of a recorded value is below 2**(1 - SUB_BUCKET_BITS):
+SUB_BUCKET_BITS = 7
+
+# The reported percentiles:
+PERCENTILES = (50.0, 90.0, 99.0)
+
+
+class LatencyHistogram:
+    """
+    A histogram of latencies in the manner of an HDR histogram.
+
+    Latencies are recorded as integer microseconds. Small values have
+    buckets of their own, and larger values fall into buckets that are
+    linear within each power of two, so that every value is known to a
+    relative error of less than 2**(1 - `sub_bucket_bits`), no matter
+    its magnitude, while the number of buckets grows only with the
+    logarithm of the largest value.
+    """
+    counts: Dict[int, int]
+    count: int
+    min: Optional[int]
+    max: Optional[int]
+
+    def __init__(self, sub_bucket_bits: int = SUB_BUCKET_BITS):
+        if sub_bucket_bits < 1:
+            raise ValueError("At least one sub-bucket bit is required.")
+        self.sub_bucket_bits = sub_bucket_bits
+        self.half_count = 1 << (sub_bucket_bits - 1)
+        self.counts = dict()
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def bucket_index(self, value: int) -> int:
+        """
+        The index of the bucket of a value (in microseconds).
+        """
+        shift = max(value.bit_length() - self.sub_bucket_bits, 0)
+        return shift * self.half_count + (value >> shift)
+
+    def bucket_range(self, index: int) -> Tuple[int, int]:
+        """
+        The smallest and largest value (in microseconds) of a bucket.
+        """
+        shift = max(index // self.half_count - 1, 0)
+        lower = (index - shift * self.half_count) << shift
+        return lower, lower + (1 << shift) - 1
+
+    def record(self, seconds: float):
+        """
+        Record a latency.
+        """
+        value = max(round(1e6 * seconds), 0)
+        index = self.bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        The `q` quantile of the latencies in seconds, or None if no
+        latency has been recorded. The midpoint of the bucket that
+        contains the quantile is returned.
+        """
+        if self.count == 0:
+            return None
+        if q < 0.0 or q > 1.0:
+            raise ValueError("The quantile has to be within [0,1].")
+        rank = max(int(q * self.count + 0.5), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                lower, upper = self.bucket_range(index)
+                value = min(max(0.5 * (lower + upper), self.min), self.max)
+                return 1e-6 * value
+        return 1e-6 * self.max
+
+    def percentiles(self) -> Dict[float, Optional[float]]:
+        """
+        The reported percentiles (p50, p90, p99) in seconds.
+        """
+        return {p : self.quantile(0.01 * p) for p in PERCENTILES}
+
+    def to_dict(self) -> dict:
+        """
+        The histogram as a JSON-serializable dictionary, e.g. to attach
+        to bug reports.
+        """
+        buckets: List[Tuple[int,int,int]] = []
+        for index in sorted(self.counts):
+            lower, upper = self.bucket_range(index)
+            buckets.append((lower, upper, self.counts[index]))
+        return {
+            "unit" : "microseconds",
+            "sub_bucket_bits" : self.sub_bucket_bits,
+            "count" : self.count,
+            "min" : self.min,
+            "max" : self.max,
+            "percentiles_seconds" : {
+                "p{:g}".format(p) : v for p,v in self.percentiles().items()
+            },
+            "buckets" : buckets
+        }
@@ -0,0 +1,246 @@
+# Compute scheduling intervals.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from math import exp, log, pi, sqrt
+from typing import Dict, List, Optional, Tuple
+from .estimators import CompileTimeEstimator
+from ..latex.compilestats import CompileKind, CompileSample
+
+# Number of keystroke waiting times and compile times kept:
+KEYSTROKE_BUFFER = 1000
+COMPILE_BUFFER = 10
+
+# Keystroke waiting times (in seconds) beyond the maximum are pauses
+# rather than typing, and times below the minimum are clipped so that
+# their logarithm remains finite:
+MAX_KEYSTROKE_TIME = 5.0
+MIN_KEYSTROKE_TIME = 1e-3
+
+# Margin on the compile time:
+COMPILE_MARGIN = 1.5
+
+# While edits keep arriving, a compilation is started at the latest after
+# this many (tail) compile times since the first pending edit, but not
+# earlier than the minimum maximum wait (in seconds):
+MAX_WAIT_FACTOR = 4.0
+MIN_MAX_WAIT = 2.0
+
+
+class Scheduler:
+    """
+    Compute scheduling times.
+
+    Keystroke waiting times are modeled by a log-logistic distribution,
+    which González et al. (2021) found to be the preferable distribution
+    to describe keystroke fly times. The distribution is estimated
+    online from running sums of the logarithmic waiting times in a ring
+    buffer, and the proposed delay is the `quantile` of the waiting time,
+    i.e. the delay after which the user has paused with probability
+    `quantile`.
+
+    Compile times are estimated separately for each kind of compilation
+    (engine, template, reuse of the format file, and size of the letter
+    body), so that the delay reflects the cost of the compilation that
+    is about to happen.
+
+    Debouncing alone would postpone the compilation as long as the user
+    types. Therefore, the scheduler also proposes a maximum wait after
+    the first pending edit, proportional to the compile time by the
+    factor `max_wait_factor` (None disables the maximum wait) and at least
+    `min_max_wait` seconds.
+
+    González, N., Calot, E. P., Ierache, J. S., Hasperué, W.: On the shape
+    of timings distributions in free-text keystroke dynamics profiles
+    """
+    compile_times: List[float]
+    compile_estimators: Dict[tuple, CompileTimeEstimator]
+    keystroke_times: List[float]
+    ct_id: int
+    kt_id: int
+    quantile: float
+    max_wait_factor: Optional[float]
+    min_max_wait: float
+
+    def __init__(self, quantile: float = 0.95,
+                 max_wait_factor: Optional[float] = MAX_WAIT_FACTOR,
+                 min_max_wait: float = MIN_MAX_WAIT):
+        if quantile <= 0.0 or quantile >= 1.0:
+            raise ValueError("Quantile has to be in the open interval "
+                             "(0,1).")
+        self.quantile = quantile
+        self.max_wait_factor = max_wait_factor
+        self.min_max_wait = min_max_wait
+        self.compile_times = []
+        self.ct_id = 0
+        self.compile_estimators = dict()
+        self.keystroke_times = []
+        self.kt_id = 0
+        # Running sums of the logarithmic keystroke times and their
+        # squares:
+        self.log_sum = 0.0
+        self.log_sq_sum = 0.0
+        # Prior of the keystroke distribution from previous sessions:
+        # weight (in observations), and the sums of the logarithmic
+        # times and their squares:
+        self.prior = (0.0, 0.0, 0.0)
+
+    def keystroke_moments(self) -> Tuple[float, float, float]:
+        """
+        Weight, mean, and variance of the logarithmic keystroke waiting
+        times, including the prior.
+        """
+        w0, s0, sq0 = self.prior
+        n = len(self.keystroke_times) + w0
+        if n == 0:
+            return 0.0, 0.0, 0.0
+        mu = (self.log_sum + s0) / n
+        var = max((self.log_sq_sum + sq0) / n - mu * mu, 0.0)
+        return n, mu, var
+
+    def set_keystroke_prior(self, weight: float, mu: float, var: float):
+        """
+        Set the prior of the keystroke distribution, i.e. `weight`
+        pseudo-observations of logarithmic waiting times with mean `mu`
+        and variance `var`.
+        """
+        weight = max(float(weight), 0.0)
+        self.prior = (weight, weight * mu, weight * (var + mu * mu))
+
+    def keystroke_distribution(self) -> Optional[Tuple[float, float]]:
+        """
+        Location `mu` and scale `s` of the log-logistic distribution of
+        keystroke waiting times, i.e. of the logistic distribution of
+        their logarithm, estimated by the method of moments. None if
+        fewer than two waiting times have been registered (including the
+        prior).
+        """
+        n, mu, var = self.keystroke_moments()
+        if n < 2:
+            return None
+        # The variance of the logistic distribution is s^2 pi^2 / 3:
+        s = sqrt(3.0 * var) / pi
+        return mu, s
+
+    def keystroke_quantile(self, quantile: Optional[float] = None) -> float:
+        """
+        The keystroke waiting time that is not exceeded with probability
+        `quantile` (defaults to the quantile of the scheduler).
+        """
+        if quantile is None:
+            quantile = self.quantile
+        params = self.keystroke_distribution()
+        if params is None:
+            n, mu, _ = self.keystroke_moments()
+            if n == 0:
+                return 0.0
+            return exp(mu)
+        mu, s = params
+        return exp(mu + s * log(quantile / (1.0 - quantile)))
+
+    def predict_compile_time(self, kind: Optional[CompileKind] = None,
+                             tail: bool = False) -> float:
+        """
+        The expected compile time of a kind of compilation, or its tail
+        quantile if `tail` is True. Falls back to compilations of any
+        body size and then to the mean of all recent compile times.
+        """
+        if kind is not None:
+            for key in (kind, kind[:3]):
+                estimator = self.compile_estimators.get(key)
+                if estimator is not None:
+                    return estimator.quantile() if tail else estimator.mean
+        if len(self.compile_times) == 0:
+            return 0.0
+        return sum(self.compile_times) / len(self.compile_times)
+
+    def propose_delay(self, kind: Optional[CompileKind] = None) -> float:
+        """
+        This method proposes a delay to wait after a keystroke
+        before starting the latex compilation of the given kind.
+        """
+        keystroke_time = self.keystroke_quantile()
+        compile_time = self.predict_compile_time(kind)
+        # Chosen waiting time:
+        return max(keystroke_time, COMPILE_MARGIN * compile_time)
+
+    def propose_max_wait(self, kind: Optional[CompileKind] = None) \
+            -> Optional[float]:
+        """
+        This method proposes the maximum time to wait after the first
+        of a series of edits before starting the latex compilation of the
+        given kind, or None if the compilation may wait indefinitely.
+        """
+        if self.max_wait_factor is None:
+            return None
+        compile_time = self.predict_compile_time(kind, tail=True)
+        return max(self.min_max_wait, self.max_wait_factor * compile_time)
+
+    def register_keystroke_waiting_time(self, T: float):
+        """
+        Register the waiting time between two keystrokes.
+        """
+        # Limit waiting time to 5 seconds:
+        if T > MAX_KEYSTROKE_TIME:
+            return
+        T = max(T, MIN_KEYSTROKE_TIME)
+        lt = log(T)
+
+        if len(self.keystroke_times) < KEYSTROKE_BUFFER:
+            self.keystroke_times.append(T)
+        else:
+            old = log(self.keystroke_times[self.kt_id])
+            self.log_sum -= old
+            self.log_sq_sum -= old * old
+            self.keystroke_times[self.kt_id] = T
+        self.log_sum += lt
+        self.log_sq_sum += lt * lt
+        self.kt_id += 1
+        if self.kt_id >= len(self.keystroke_times):
+            self.kt_id = 0
+            # Recompute the sums once per cycle through the buffer to
+            # avoid the accumulation of rounding errors:
+            if len(self.keystroke_times) == KEYSTROKE_BUFFER:
+                logs = [log(t) for t in self.keystroke_times]
+                self.log_sum = sum(logs)
+                self.log_sq_sum = sum(l * l for l in logs)
+
+    def register_compile(self, sample: CompileSample):
+        """
+        Register the measurements of a LaTeX compilation.
+        """
+        self.register_compile_time(sample.seconds)
+        kind = sample.kind
+        for key in (kind, kind[:3]):
+            estimator = self.compile_estimators.get(key)
+            if estimator is None:
+                estimator = CompileTimeEstimator()
+                self.compile_estimators[key] = estimator
+            estimator.add(sample.seconds)
+
+    def register_compile_time(self, T: float):
+        """
+        Register a LaTeX compile time of any kind.
+        """
+        if len(self.compile_times) < COMPILE_BUFFER:
+            self.compile_times.append(T)
+        else:
+            self.compile_times[self.ct_id] = T
+        self.ct_id += 1
+        if self.ct_id >= len(self.compile_times):
+            self.ct_id = 0
@@ -0,0 +1,123 @@
+# Persistence of the scheduler statistics between sessions.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import marshal
+from pathlib import Path
+from typing import Optional
+from .scheduler import Scheduler
+from .estimators import CompileTimeEstimator
+
+# Bump this version whenever the layout of the statistics changes:
+STATS_VERSION = 1
+
+STATS_FILE = "scheduler-stats.marshal"
+
+# Weight of the statistics of previous sessions relative to their
+# number of observations, and the maximum number of keystroke waiting
+# times that the previous sessions count as:
+STATS_DECAY = 0.5
+MAX_KEYSTROKE_PRIOR = 200
+
+
+def _default_stats_file() -> Optional[Path]:
+    try:
+        from ..cache import cache_directory
+        return cache_directory() / STATS_FILE
+    except OSError:
+        return None
+
+
+def _read_stats(stats_file: Path) -> dict:
+    try:
+        with open(stats_file, 'rb') as f:
+            stats = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return {}
+    if not isinstance(stats, dict) or stats.get("version") != STATS_VERSION:
+        return {}
+    return stats
+
+
+def load_scheduler_stats(scheduler: Scheduler, engine: str, template: str,
+                         stats_file: Optional[Path] = None,
+                         decay: float = STATS_DECAY):
+    """
+    Initialize a scheduler with the statistics of previous sessions.
+
+    The keystroke statistics are shared, the compile time statistics
+    are kept per engine and template. Their weight is decayed so that
+    fresh observations quickly dominate.
+    """
+    if stats_file is None:
+        stats_file = _default_stats_file()
+        if stats_file is None:
+            return
+    stats = _read_stats(stats_file)
+    if len(stats) == 0:
+        return
+    try:
+        n, mu, var = stats["keystrokes"]
+        scheduler.set_keystroke_prior(min(n * decay, MAX_KEYSTROKE_PRIOR),
+                                      mu, var)
+        compile_stats = stats["compile"].get((engine, template))
+        if compile_stats is not None:
+            compile_times, estimators = compile_stats
+            scheduler.compile_times = list(compile_times)
+            scheduler.ct_id = 0
+            for key, state in estimators.items():
+                scheduler.compile_estimators[(engine, template) + key] \
+                   = CompileTimeEstimator.from_state(state, decay)
+    except (KeyError, ValueError, TypeError):
+        # Statistics that do not fit are discarded.
+        return
+
+
+def save_scheduler_stats(scheduler: Scheduler, engine: str, template: str,
+                         stats_file: Optional[Path] = None):
+    """
+    Save the statistics of a scheduler for the next session.
+    """
+    if stats_file is None:
+        stats_file = _default_stats_file()
+        if stats_file is None:
+            return
+    stats = _read_stats(stats_file)
+    if len(stats) == 0:
+        stats = {"version" : STATS_VERSION, "compile" : {}}
+    stats["keystrokes"] = scheduler.keystroke_moments()
+    estimators = {
+        key[2:] : estimator.state()
+        for key, estimator in scheduler.compile_estimators.items()
+        if key[:2] == (engine, template)
+    }
+    stats["compile"][(engine, template)] \
+       = (tuple(scheduler.compile_times), estimators)
+
+    tmp = stats_file.with_name(stats_file.name + "." + str(os.getpid()))
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(marshal.dumps(stats))
+        os.replace(tmp, stats_file)
+    except OSError:
+        # The statistics are an optimization only.
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
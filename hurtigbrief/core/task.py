@@ -0,0 +1,71 @@
+# A latex task.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from ..abstraction.letter import Letter
+from ..abstraction.design import Design
+from ..latex.mklatex import do_latex
+from ..latex.workspace import Workspace
+from ..latex.preamblecache import PreambleCache
+from ..latex.compilestats import CompileSample
+from .types import TemplateName
+from pathlib import Path
+from typing import Optional
+
+class TaskResult:
+    """
+    Result of a LaTeX task. The edit time is the (monotonic) time of
+    the edit from which the document was compiled.
+    """
+    document_path: str
+    edit_time: Optional[float]
+    sample: Optional[CompileSample]
+
+    def __init__(self, document_path: str,
+                 edit_time: Optional[float] = None,
+                 sample: Optional[CompileSample] = None):
+        self.document_path = str(document_path)
+        self.edit_time = edit_time
+        self.sample = sample
+
+    def __repr__(self) -> str:
+        return "TaskResult('" + self.document_path + "')"
+
+
+class LatexTask:
+    """
+    A latex compilation job.
+    """
+    def __init__(self, letter: Letter, design: Design, template: TemplateName,
+                 workspace: Workspace, preamble_cache: PreambleCache,
+                 edit_time: Optional[float] = None):
+        self.letter = letter
+        self.design = design
+        self.template = template
+        self.workspace = workspace
+        self.preamble_cache = preamble_cache
+        self.edit_time = edit_time
+
+    def run(self) -> TaskResult:
+        sample = do_latex(self.letter, self.design, self.template,
+                          self.workspace, self.preamble_cache,
+                          output_to_workspace=True)
+        fullpath = str((Path(self.workspace.directory.name)
+                        / "letter.pdf").resolve())
+        uri = "file://" + fullpath
+        return TaskResult(uri, self.edit_time, sample)
@@ -0,0 +1,195 @@
+# A GUI-agnostic loop that debounces and compiles letters.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from .task import LatexTask, TaskResult
+from .types import TemplateName
+from ..abstraction import Letter, Design
+from ..latex.workspace import Workspace
+from ..latex.preamblecache import PreambleCache
+from ..latex.worker import LatexWorker
+from ..latex.mklatex import warm_preamble
+from typing import Callable, Literal, Optional, Tuple
+from threading import Condition, Thread
+from time import monotonic
+from warnings import warn
+
+Job = Tuple[Letter, Design, TemplateName, float]
+
+# Where the letters are compiled: in a thread of this process or in a
+# worker process.
+Backend = Literal["thread", "process"]
+
+ResultCallback = Callable[[TaskResult], None]
+ErrorCallback = Callable[[Exception], None]
+
+
+class TaskLoop(Thread):
+    """
+    A persistent loop that debounces submitted jobs and compiles them
+    one at a time.
+
+    Only the most recently submitted job is kept. It becomes due after
+    its delay, and the loop waits on a condition until then, so that
+    neither submissions nor compilations create threads.
+
+    The results and errors are passed to the `on_result` and `on_error`
+    callbacks, which are called from the loop's thread. It is up to the
+    caller to pass them on to, e.g., a GUI main loop.
+
+    With the "process" backend, the letters are compiled by a worker
+    process with a workspace and preamble cache of its own. The key of
+    the preamble format cached by the worker is mirrored in the
+    preamble cache of this process.
+    """
+    pending: Optional[Tuple[float, Job]]
+    first_pending: Optional[float]
+    worker: Optional[LatexWorker]
+    stopped: bool
+
+    def __init__(self, workspace: Workspace, preamble_cache: PreambleCache,
+                 on_result: ResultCallback, on_error: ErrorCallback,
+                 backend: Backend = "thread"):
+        # Set it as a daemon thread:
+        super().__init__(daemon=True)
+        if backend not in ("thread", "process"):
+            raise ValueError("Unknown backend '" + str(backend) + "'.")
+        self.workspace = workspace
+        self.preamble_cache = preamble_cache
+        self.on_result = on_result
+        self.on_error = on_error
+        self.worker = LatexWorker() if backend == "process" else None
+        self.condition = Condition()
+        self.pending = None
+        # Time of the first submission since the last start:
+        self.first_pending = None
+        self.stopped = False
+
+    def submit(self, job: Job, delay: float, max_wait: Optional[float]):
+        """
+        Replace the pending job. It becomes due after `delay` seconds, or
+        at the latest `max_wait` seconds after the first pending
+        submission.
+        """
+        now = monotonic()
+        with self.condition:
+            if self.first_pending is None:
+                self.first_pending = now
+            due = now + delay
+            if max_wait is not None:
+                due = min(due, self.first_pending + max_wait)
+            self.pending = (due, job)
+            self.condition.notify()
+
+    def prewarm(self, letter: Letter, design: Design,
+                template: TemplateName):
+        """
+        Build the preamble format of a letter in a background thread.
+        A compilation that needs the format while it is being built
+        waits for the build instead of building it again.
+        """
+        Thread(target=self._prewarm, args=(letter, design, template),
+               daemon=True).start()
+
+    def _prewarm(self, letter: Letter, design: Design,
+                 template: TemplateName):
+        try:
+            if self.worker is None:
+                warm_preamble(letter, design, template, self.preamble_cache)
+            else:
+                try:
+                    self.worker.warm(letter, design, template)
+                finally:
+                    self.preamble_cache.key = self.worker.preamble_key
+        except Exception as e:
+            # The compilation of the letter will report the error:
+            warn("Warming up the preamble format failed: " + str(e))
+
+    def cancel(self) -> bool:
+        """
+        Drop the pending job, if any. A compilation that has already
+        started is not interrupted.
+        Returns whether a job was dropped.
+        """
+        with self.condition:
+            dropped = self.pending is not None
+            self.pending = None
+            self.first_pending = None
+            self.condition.notify()
+        return dropped
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Drop the pending job and end the loop after the current
+        compilation, if any.
+        """
+        with self.condition:
+            self.stopped = True
+            self.pending = None
+            self.first_pending = None
+            self.condition.notify()
+        if self.is_alive():
+            self.join(timeout)
+        if self.worker is not None:
+            self.worker.close()
+
+    def next_job(self) -> Optional[Job]:
+        """
+        Wait for the pending job to become due. Returns None once the
+        loop has been stopped.
+        """
+        with self.condition:
+            while not self.stopped:
+                if self.pending is None:
+                    self.condition.wait()
+                    continue
+                due, job = self.pending
+                remaining = due - monotonic()
+                if remaining <= 0.0:
+                    self.pending = None
+                    self.first_pending = None
+                    return job
+                self.condition.wait(remaining)
+        return None
+
+    def compile(self, job: Job) -> TaskResult:
+        """
+        Compile a job with the selected backend.
+        """
+        letter, design, template, edit_time = job
+        if self.worker is None:
+            task = LatexTask(letter, design, template, self.workspace,
+                             self.preamble_cache, edit_time)
+            return task.run()
+        try:
+            document, sample = self.worker.compile(letter, design, template)
+        finally:
+            self.preamble_cache.key = self.worker.preamble_key
+        return TaskResult("file://" + document, edit_time, sample)
+
+    def run(self):
+        while True:
+            job = self.next_job()
+            if job is None:
+                return
+            try:
+                result = self.compile(job)
+            except Exception as e:
+                self.on_error(e)
+                continue
+            self.on_result(result)
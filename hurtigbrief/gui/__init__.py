@@ -1,2 +1,12 @@
 # The GUI init file.
-from .app import HurtigbriefApp
+#
+# The application is imported on first access so that the GTK-free
+# modules of this package (e.g. the configuration) can be imported
+# without loading GTK.
+
+def __getattr__(name):
+    if name == "HurtigbriefApp":
+        from .app import HurtigbriefApp
+        return HurtigbriefApp
+    raise AttributeError("module " + repr(__name__) + " has no attribute "
+                         + repr(name))
@@ -18,15 +18,20 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from .gtk import Gtk
+from .gtk import Gtk, GLib
 from .window import HurtigbriefWindow
-from .scheduler import Scheduler
-from .types import TemplateName
+from .config import config
+from ..core.scheduler import Scheduler
+from ..core.schedulerstats import load_scheduler_stats, save_scheduler_stats
+from ..core.types import TemplateName
 from .manager import TaskManager
-from .task import TaskResult
+from ..core.task import TaskResult
 from ..abstraction import Letter, Design
 from ..latex.workspace import Workspace
 from ..latex.preamblecache import PreambleCache
+from ..latex.compilestats import CompileSample, compile_kind
+from ..latex.mklatex import preamble_key
+from ..latex.config import latex_cmd
 from datetime import datetime
 
 class HurtigbriefApp(Gtk.Application):
@@ -36,14 +41,19 @@ class HurtigbriefApp(Gtk.Application):
     def __init__(self):
         super().__init__(application_id='app.Hurtigbrief')
         self.connect('activate', HurtigbriefApp.on_activate)
+        self.connect('shutdown', HurtigbriefApp.on_shutdown)
         print("finished initialization!")
         self.workspace = Workspace()
         self.preamble_cache = PreambleCache(self.workspace)
-        self.task_manager = TaskManager(self.workspace, self.preamble_cache)
+        self.task_manager = TaskManager(self.workspace, self.preamble_cache,
+                                        config["compile_backend"])
         self.task_manager.connect("notify_result", self.on_receive_result)
         self.task_manager.connect("notify_compile_time",
                                   self.on_receive_compile_time)
+        self.task_manager.connect("notify_error", self.on_receive_error)
+        # The scheduler starts from the statistics of previous sessions:
         self.scheduler = Scheduler()
+        load_scheduler_stats(self.scheduler, latex_cmd, "scrletter")
         self.document = None
         # Measure the time since the last document change:
         self.lastchange = None
@@ -52,6 +62,27 @@ class HurtigbriefApp(Gtk.Application):
         self.window = HurtigbriefWindow(application=self)
         self.window.connect("letter_changed", self.on_letter_changed)
         self.window.present()
+        # Build the format of the default sender's preamble before the
+        # first edit:
+        GLib.idle_add(self.prewarm)
+
+    def prewarm(self) -> bool:
+        """
+        Start building the preamble format of the letters to come.
+        """
+        letter = self.window.preamble_letter()
+        if letter is not None:
+            self.task_manager.prewarm(
+                letter, Design(body_format=self.window.body_format),
+                "scrletter"
+            )
+        return False
+
+    def on_shutdown(self):
+        """
+        Save the scheduler statistics for the next session.
+        """
+        save_scheduler_stats(self.scheduler, latex_cmd, "scrletter")
 
     def on_letter_changed(self, window: HurtigbriefWindow, letter: Letter,
                           design: Design, template: TemplateName):
@@ -64,8 +95,17 @@ class HurtigbriefApp(Gtk.Application):
             dt = (now - self.lastchange).total_seconds()
             self.scheduler.register_keystroke_waiting_time(dt)
         self.lastchange = now
-        delay_seconds =  self.scheduler.propose_delay()
-        self.task_manager.submit(delay_seconds, letter, design, template)
+
+        # Predict the kind of the compilation from whether the preamble
+        # format can be reused:
+        format_hit = self.preamble_cache.is_current(
+            preamble_key(letter, design, template)
+        )
+        kind = compile_kind(latex_cmd, template, format_hit, len(letter.body))
+        delay_seconds =  self.scheduler.propose_delay(kind)
+        max_wait = self.scheduler.propose_max_wait(kind)
+        self.task_manager.submit(delay_seconds, letter, design, template,
+                                 max_wait)
 
     def on_receive_result(self, manager: TaskManager, result: TaskResult):
         """
@@ -73,11 +113,18 @@ class HurtigbriefApp(Gtk.Application):
         """
         self.window.on_receive_result(result)
 
-    def on_receive_compile_time(self, compile_time: float):
+    def on_receive_error(self, manager: TaskManager, error: Exception):
+        """
+        Receive the error of a failed latex compilation.
+        """
+        self.window.on_compile_error(error)
+
+    def on_receive_compile_time(self, manager: TaskManager,
+                                sample: CompileSample):
         """
-        Receive the runtime of the LaTeX compilation in seconds.
+        Receive the measurements of a LaTeX compilation.
         """
-        self.scheduler.register_compile_time(compile_time)
+        self.scheduler.register_compile(sample)
 
 
 def run_hurtigbrief():
@@ -17,66 +17,154 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import os
 import json
-from os import mkdir
 from pathlib import Path
-from typing import Optional
-from appdirs import user_config_dir
-
-# Get the configuration directory:
-confdir = user_config_dir("hurtigbrief","mjz")
-print("confdir:",confdir)
-confdir = Path(confdir)
-conffile = confdir / "hurtigbrief.conf"
-
-# Load the configuration file:
-try:
-    with open(conffile, "r") as f:
-        default = json.load(f)
-except FileNotFoundError:
-    # Config file does not yet exist.
-    # Default configuration:
-    default = {
-        "closing" : "Mit freundlichen Grüßen",
-        "opening" : "Sehr geehrte Damen und Herren",
-        "default_sender" : None,
-        #
-        # Addresses:
-        #
-        "addresses" : [
-        ],
-        #
-        # People:
-        #
-        "people"  : [
-        ]
-    }
-    if not confdir.is_dir():
-        mkdir(confdir)
-    with open(conffile, "w") as f:
-        json.dump(default, f)
-except:
-    raise RuntimeError("Configuration file " + str(conffile.absolute())
-                       + " cannot be loaded.")
-
-# Save the configuration file:
-def save_contacts(default_sender: Optional[int],
-                  addresses: list[dict],
-                  people: list[dict]):
+from threading import RLock
+from typing import Any, Optional, TYPE_CHECKING
+if TYPE_CHECKING:
+    from ..contacts.store import ContactStore
+
+# Default configuration:
+DEFAULT_CONFIG = {
+    "closing" : "Mit freundlichen Grüßen",
+    "opening" : "Sehr geehrte Damen und Herren",
+    "default_sender" : None,
+    #
+    # Where letters are compiled ("thread" or "process"):
+    #
+    "compile_backend" : "thread",
+    #
+    # Addresses:
+    #
+    "addresses" : [
+    ],
+    #
+    # People:
+    #
+    "people"  : [
+    ]
+}
+
+
+class Configuration:
+    """
+    The configuration of Hurtigbrief.
+
+    Nothing is read from or written to disk before it is first needed:
+    the configuration file is read when the first setting is requested,
+    and the contact store is opened when the contacts are first
+    accessed.
+
+    If `settings` are given, they are used instead of the settings of
+    the configuration file, which is then neither read nor written.
+    """
+    def __init__(self, confdir: Optional[Path] = None,
+                 settings: Optional[dict] = None):
+        self._confdir = confdir
+        self._settings = settings
+        self._contacts = None
+        self.lock = RLock()
+
+    @property
+    def confdir(self) -> Path:
+        """
+        The configuration directory.
+        """
+        if self._confdir is None:
+            from appdirs import user_config_dir
+            self._confdir = Path(user_config_dir("hurtigbrief","mjz"))
+        return self._confdir
+
+    @property
+    def conffile(self) -> Path:
+        return self.confdir / "hurtigbrief.conf"
+
+    @property
+    def contactsfile(self) -> Path:
+        return self.confdir / "contacts.sqlite"
+
+    @property
+    def settings(self) -> dict:
+        """
+        The settings of the configuration file, read on first access.
+        """
+        with self.lock:
+            if self._settings is None:
+                self._settings = self._load_settings()
+            return self._settings
+
+    def _load_settings(self) -> dict:
+        conffile = self.conffile
+        try:
+            with open(conffile, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            # Config file does not yet exist.
+            settings = dict(DEFAULT_CONFIG)
+            self.confdir.mkdir(parents=True, exist_ok=True)
+            with open(conffile, "w") as f:
+                json.dump(settings, f)
+            return settings
+        except:
+            raise RuntimeError("Configuration file "
+                               + str(conffile.absolute())
+                               + " cannot be loaded.")
+
+    def __getitem__(self, key: str) -> Any:
+        """
+        A setting, falling back to its default value.
+        """
+        settings = self.settings
+        if key in settings:
+            return settings[key]
+        return DEFAULT_CONFIG[key]
+
+    @property
+    def journalfile(self) -> Path:
+        return self.confdir / "contacts.journal"
+
+    @property
+    def contacts(self) -> "ContactStore":
+        """
+        The contact store, opened on first access. When the store does
+        not yet exist, the contacts are migrated from the JSON
+        configuration file into a temporary store, which is renamed into
+        place once the migration has succeeded. Edits are journaled so
+        that they are durable before the contacts are saved.
+        """
+        with self.lock:
+            if self._contacts is None:
+                from ..contacts.store import ContactStore
+                from ..contacts.journal import ContactJournal
+                contactsfile = self.contactsfile
+                if not contactsfile.exists():
+                    contactsfile.parent.mkdir(parents=True, exist_ok=True)
+                    # A journal without a store is stale:
+                    self.journalfile.unlink(missing_ok=True)
+                    # Migrate into a temporary file so that a failed
+                    # migration is retried on the next start:
+                    tmpfile = contactsfile.with_name(contactsfile.name
+                                                     + ".migrating")
+                    tmpfile.unlink(missing_ok=True)
+                    store = ContactStore(tmpfile)
+                    try:
+                        store.migrate_from_json(self.settings)
+                    finally:
+                        store.close()
+                    os.replace(tmpfile, contactsfile)
+                self._contacts = ContactStore(contactsfile,
+                                              ContactJournal(self.journalfile))
+            return self._contacts
+
+
+# The configuration:
+config = Configuration()
+
+
+# Save the contacts:
+def save_contacts(store: "ContactStore"):
     """
-    This function saves the config file.
+    This function saves the contacts.
     """
-    a2i = {a : i for i,a in enumerate(addresses)}
-    def person_to_json(p) -> str:
-        jsn = p.to_json()
-        jsn["address"] = a2i[p.address]
-        return jsn
-
-    with open(conffile, "w") as f:
-        json.dump({
-            "closing" : default["closing"],
-            "opening" : default["opening"],
-            "default_sender" : default_sender,
-            "addresses" : [a.to_json() for a in addresses],
-            "people" : [person_to_json(p) for p in people]
-        }, f, indent=2, sort_keys=True)
+    store.commit()
@@ -17,11 +17,24 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from .gtk import Gtk, GObject
+from .gtk import Gtk, GObject, GLib
 from ..abstraction.address import Address, GermanAddress
 from ..abstraction.person import Person
+from ..abstraction.postalcodes import postal_code_index, validate_address
+from ..contacts.store import ContactStore
+from ..contacts.importer import import_file, export_file, ImportProgress, \
+                                VCARD_SUFFIXES, CSV_SUFFIXES
+from .contactsmodel import ContactsTreeModel, ERROR_COLUMN, \
+                           BACKGROUND_COLUMN
+from pathlib import Path
 from typing import List, Optional
 
+# Number of records imported per main loop iteration:
+IMPORT_BATCH = 500
+
+# Number of import errors listed after an import:
+IMPORT_ERRORS_SHOWN = 10
+
 
 class ContactsDialog(Gtk.Dialog):
     """
@@ -32,7 +45,9 @@ class ContactsDialog(Gtk.Dialog):
         "person_changed" : (GObject.SIGNAL_RUN_FIRST, None,
                             (object,)),
         "default_sender_changed" : (GObject.SIGNAL_RUN_FIRST, None,
-                                    (object,))
+                                    (object,)),
+        "contacts_imported" : (GObject.SIGNAL_RUN_FIRST, None,
+                               (object,))
     }
 
     def __init__(self, parent, address_type=GermanAddress):
@@ -40,40 +55,46 @@ class ContactsDialog(Gtk.Dialog):
 
         self.address_type = address_type
 
-        self.people_model = Gtk.ListStore(str, str, str, str)
-        self.people_view = Gtk.TreeView(model=self.people_model,
-                                        headers_visible=True)
-        self.people_view.set_hexpand(True)
-        self.people_view.set_vexpand(True)
+        # The people model is set in `set_data`. Rows of fixed height
+        # allow the view to materialize only the visible rows:
+        self.people_model = None
+        self.people_view = Gtk.TreeView(headers_visible=True)
+        self.people_view.set_fixed_height_mode(True)
+        # Invalid rows are highlighted and explain their problem in
+        # their tooltip:
+        self.people_view.set_tooltip_column(ERROR_COLUMN)
+        people_scroll = Gtk.ScrolledWindow()
+        people_scroll.add(self.people_view)
+        people_scroll.set_hexpand(True)
+        people_scroll.set_vexpand(True)
+        people_scroll.set_min_content_height(300)
+        people_scroll.set_min_content_width(600)
 
         # The columns to display
         # 1) Name
         renderer = Gtk.CellRendererText(editable=True)
         renderer.connect("edited", self.name_edited)
         column = Gtk.TreeViewColumn("Name", renderer, text=0, weight=1)
-        column.set_expand(True)
-        self.people_view.append_column(column)
+        self.append_column(column)
 
         # 2) Address
         renderer = Gtk.CellRendererText(editable=True)
         renderer.connect("edited", self.address_edited)
+        renderer.connect("editing-started", self.address_editing_started)
         column = Gtk.TreeViewColumn("Address", renderer, text=1, weight=1)
-        column.set_expand(True)
-        self.people_view.append_column(column)
+        self.append_column(column)
 
         # 3) E-Mail
         renderer = Gtk.CellRendererText(editable=True)
         renderer.connect("edited", self.email_edited)
         column = Gtk.TreeViewColumn("E-Mail", renderer, text=2, weight=1)
-        column.set_expand(True)
-        self.people_view.append_column(column)
+        self.append_column(column)
 
         # 4) Phone
         renderer = Gtk.CellRendererText(editable=True)
         renderer.connect("edited", self.phone_edited)
         column = Gtk.TreeViewColumn("Phone", renderer, text=3, weight=1)
-        column.set_expand(True)
-        self.people_view.append_column(column)
+        self.append_column(column)
 
         # Default contact:
         label_sender = Gtk.Label('Default sender:', halign=Gtk.Align.START)
@@ -81,29 +102,63 @@ class ContactsDialog(Gtk.Dialog):
         renderer = Gtk.CellRendererText()
         self.cb_default_sender.pack_start(renderer, True)
         self.cb_default_sender.add_attribute(renderer, 'text', 0)
-
+        self.default_sender_handler = self.cb_default_sender.connect(
+            "changed", self.on_default_sender_changed
+        )
+
+        # Import and export:
+        self.contacts = None
+        self.import_steps = None
+        self.import_start = 0
+        self.import_button = Gtk.Button(label="Import...")
+        self.import_button.connect("clicked", self.on_import_clicked)
+        self.export_button = Gtk.Button(label="Export...")
+        self.export_button.connect("clicked", self.on_export_clicked)
+        self.import_progress = Gtk.ProgressBar(show_text=True)
+        self.import_progress.set_no_show_all(True)
+        buttons = Gtk.Box(spacing=6)
+        buttons.pack_start(self.import_button, False, False, 0)
+        buttons.pack_start(self.export_button, False, False, 0)
+        buttons.pack_start(self.import_progress, True, True, 0)
+
+        # The problem of the last edited row, if it is invalid:
+        self.status_label = Gtk.Label("", halign=Gtk.Align.START)
 
         layout = Gtk.Grid()
-        layout.attach(self.people_view, 0, 0, 2, 1)
+        layout.attach(people_scroll, 0, 0, 2, 1)
         layout.attach(label_sender, 0, 1, 1, 1)
         layout.attach(self.cb_default_sender, 1, 1, 1, 1)
+        layout.attach(self.status_label, 0, 2, 2, 1)
+        layout.attach(buttons, 0, 3, 2, 1)
         self.get_content_area().add(layout)
         self.show_all()
 
 
+    def append_column(self, column: Gtk.TreeViewColumn):
+        """
+        Append a column of fixed sizing to the people view.
+        """
+        for renderer in column.get_cells():
+            column.add_attribute(renderer, "cell-background",
+                                 BACKGROUND_COLUMN)
+        column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        column.set_fixed_width(150)
+        column.set_resizable(True)
+        column.set_expand(True)
+        self.people_view.append_column(column)
+
+
     def update_person(self, row: int) -> bool:
         """
-        Store the person at 'row'.
+        Store the person at 'row'. If the row does not form a valid
+        person, the row is marked as invalid and the problem, if known,
+        is shown.
         """
         # Get the data saved in the row:
-        if row >= self.people_model.iter_n_children():
+        if row >= len(self.people_model):
             raise RuntimeError("Row out of bounds.")
 
-        it = self.people_model.get_iter(row)
-        name_s = self.people_model.get(it, 0)[0]
-        addr_s = self.people_model.get(it, 1)[0]
-        email_s = self.people_model.get(it, 2)[0]
-        phone_s = self.people_model.get(it, 3)[0]
+        name_s, addr_s, email_s, phone_s = self.people_model.get_row(row)
 
         # Try to construct the address:
         try:
@@ -111,16 +166,26 @@ class ContactsDialog(Gtk.Dialog):
         except:
             # Return early (this person needs more editing before we allow
             # its creation into the people list)
+            if len(addr_s.strip()) > 0:
+                self.set_row_error(row, "The address '" + addr_s
+                                   + "' cannot be read.")
             return False
 
+        # Check the postal code and city if postal code data is available:
+        if isinstance(address, GermanAddress):
+            message = validate_address(address)
+            if message is not None:
+                self.set_row_error(row, message)
+                return False
+        self.set_row_error(row, None)
+
         # See if the address is known:
-        if address in self.a2i:
-            i = self.a2i[address]
-        else:
+        try:
+            i = self.addresses.index(address)
+        except ValueError:
             # Unknown, create new:
             i = len(self.addresses)
             self.addresses.append(address)
-            self.a2i[address] = i
 
         # Create the new person:
         p = Person(name_s, self.addresses[i], email_s, phone_s)
@@ -132,24 +197,36 @@ class ContactsDialog(Gtk.Dialog):
         return True
 
 
+    def set_row_error(self, row: int, message: Optional[str]):
+        """
+        Mark a row as invalid because of `message` and show the message,
+        or mark it as valid if the message is None.
+        """
+        self.people_model.set_error(row, message)
+        self.status_label.set_text("" if message is None
+                                   else "Row " + str(row + 1) + ": " + message)
+
+
     def edited(self, row, col, new_text):
         """
         General edited call.
         """
-        is_new_row = row + 1 == self.people_model.iter_n_children()
+        # People are appended while importing, so that row indices of the
+        # model are not up to date:
+        if self.import_steps is not None:
+            return
 
         # Update the model:
-        it = self.people_model.get_iter(row)
-        self.people_model.set(it, col, new_text)
+        self.people_model.set_text(row, col, new_text)
 
         # Update the person:
         if not self.update_person(row):
             # Edit did not lead to a valid person!
             return
 
-        # If the last, empty row is edited, add a new row:
-        if is_new_row:
-            self.people_model.append(("","","",""))
+        # Update the row in place. If the last, empty row is edited,
+        # this adds a new row:
+        self.people_model.person_changed(row)
 
         # This person changed!
         self.emit("person_changed", row)
@@ -167,6 +244,57 @@ class ContactsDialog(Gtk.Dialog):
         self.edited(row, 1, new_text)
 
 
+    def address_editing_started(self, renderer, editable, path):
+        """
+        Attach postal code and city completion to the address editor.
+        """
+        if postal_code_index() is None:
+            return
+        completion = Gtk.EntryCompletion()
+        completion.set_model(Gtk.ListStore(str))
+        completion.set_text_column(0)
+        completion.set_minimum_key_length(1)
+        # The model contains only matching completions:
+        completion.set_match_func(lambda *args: True)
+        completion.connect("match-selected", self.address_completion_selected)
+        editable.set_completion(completion)
+        editable.connect("changed", self.address_text_changed)
+
+
+    def address_text_changed(self, entry):
+        """
+        Update the completions from the postal code and city after the
+        last comma.
+        """
+        index = postal_code_index()
+        completion = entry.get_completion()
+        if index is None or completion is None:
+            return
+        prefix = entry.get_text().rpartition(",")[2].strip()
+        if len(prefix) == 0:
+            matches = []
+        elif prefix[0].isdigit():
+            matches = index.complete_postal_code(prefix.split()[0])
+        else:
+            matches = index.complete_city(prefix)
+        model = completion.get_model()
+        model.clear()
+        for plz, city in matches:
+            model.append(("{:05d} {}".format(plz, city),))
+
+
+    def address_completion_selected(self, completion, model, it):
+        """
+        Replace the postal code and city by the selected completion.
+        """
+        entry = completion.get_entry()
+        street, comma, _ = entry.get_text().rpartition(",")
+        text = (street + ", " if comma else "") + model[it][0]
+        entry.set_text(text)
+        entry.set_position(len(text))
+        return True
+
+
     def email_edited(self, *args):
         # If the last, empty row is edited, add a new row:
         row = int(args[1])
@@ -182,34 +310,41 @@ class ContactsDialog(Gtk.Dialog):
 
 
     def set_data(self, addresses: List[Address], people: List[Person],
-                 default_sender: Optional[int]):
+                 default_sender: Optional[int],
+                 contacts: Optional[ContactStore] = None):
         """
-        Register the contact 'data base'.
+        Register the contact 'data base'. Contacts can only be imported
+        and exported if the contact store is given.
         """
         self.addresses = addresses
         self.people = people
-        address_indices = []
-        a2i = {a : i for i,a in enumerate(addresses)}
-        for person in self.people:
-            i = a2i[person.address]
-            addr = ", ".join(person.address.compose())
-            self.people_model.append((person.name, addr,
-                                      person.email, person.phone))
-            address_indices.append(i)
-        self.address_indices = address_indices
-        self.a2i = a2i
-
-        # Add the editable final row:
-        self.people_model.append(("","","",""))
+        self.contacts = contacts
+        self.import_button.set_sensitive(contacts is not None)
+        self.export_button.set_sensitive(contacts is not None)
+
+        # The lazy model of the people and the editable final row:
+        self.set_people_model()
 
         # Set the default sender:
-        self.cb_default_sender.set_model(self.people_model)
-        self.cb_default_sender.connect("changed",
-                                       self.on_default_sender_changed)
         if default_sender is not None:
             self.cb_default_sender.set_active(default_sender)
 
 
+    def set_people_model(self):
+        """
+        (Re-)create the model of the people, keeping the selected
+        default sender.
+        """
+        self.people_model = ContactsTreeModel(self.people)
+        self.people_view.set_model(self.people_model)
+        with self.cb_default_sender.handler_block(
+                self.default_sender_handler
+        ):
+            active = self.cb_default_sender.get_active()
+            self.cb_default_sender.set_model(self.people_model)
+            self.cb_default_sender.set_active(active)
+
+
     def on_default_sender_changed(self, cbox):
         """
         This slot is called when the default sender ComboBox
@@ -219,3 +354,165 @@ class ContactsDialog(Gtk.Dialog):
         if active == -1:
             active = None
         self.emit("default_sender_changed", active)
+
+
+    def select_contacts_file(self, title: str, action: Gtk.FileChooserAction,
+                             button: str) -> Optional[Path]:
+        """
+        Run a dialog to select a vCard or CSV file.
+        """
+        dialog = Gtk.FileChooserDialog(
+            parent = self,
+            title = title,
+            action = action
+        )
+        dialog.add_buttons(
+            Gtk.STOCK_CANCEL,
+            Gtk.ResponseType.CANCEL,
+            button,
+            Gtk.ResponseType.OK,
+        )
+        if action == Gtk.FileChooserAction.SAVE:
+            dialog.set_do_overwrite_confirmation(True)
+            dialog.set_current_name("contacts.vcf")
+        for name, suffixes in (("vCard files", VCARD_SUFFIXES),
+                               ("CSV files", CSV_SUFFIXES)):
+            file_filter = Gtk.FileFilter()
+            file_filter.set_name(name)
+            for suffix in suffixes:
+                file_filter.add_pattern("*" + suffix)
+            dialog.add_filter(file_filter)
+
+        status = dialog.run()
+        path = None
+        if status == Gtk.ResponseType.OK:
+            path = Path(dialog.get_filename())
+        dialog.destroy()
+        return path
+
+
+    def show_message(self, message_type: Gtk.MessageType, text: str,
+                     secondary: Optional[str] = None):
+        """
+        Show a modal message.
+        """
+        dialog = Gtk.MessageDialog(
+            transient_for = self,
+            message_type = message_type,
+            buttons = Gtk.ButtonsType.OK,
+            text = text
+        )
+        if secondary is not None:
+            dialog.format_secondary_text(secondary)
+        dialog.run()
+        dialog.destroy()
+
+
+    def on_import_clicked(self, button):
+        """
+        Import contacts from a vCard or CSV file.
+        """
+        if self.contacts is None or self.import_steps is not None:
+            return
+        path = self.select_contacts_file("Import contacts",
+                                         Gtk.FileChooserAction.OPEN,
+                                         Gtk.STOCK_OPEN)
+        if path is None:
+            return
+        if path.suffix.lower() not in VCARD_SUFFIXES + CSV_SUFFIXES:
+            self.show_message(Gtk.MessageType.ERROR,
+                              "Unknown contact file format.")
+            return
+
+        # The import runs in steps within the main loop so that the
+        # dialog stays responsive and the progress can be shown:
+        self.import_start = len(self.people)
+        self.import_steps = import_file(self.contacts, path,
+                                        batch=IMPORT_BATCH)
+        self.import_button.set_sensitive(False)
+        self.export_button.set_sensitive(False)
+        self.import_progress.set_fraction(0.0)
+        self.import_progress.set_text("Importing " + path.name)
+        self.import_progress.show()
+        GLib.idle_add(self.import_step)
+
+
+    def import_step(self) -> bool:
+        """
+        Import the next batch of records.
+        """
+        try:
+            progress = next(self.import_steps)
+        except StopIteration:
+            progress = None
+        except (OSError, ValueError) as e:
+            self.finish_import(None)
+            self.show_message(Gtk.MessageType.ERROR,
+                              "Could not import the contacts.", str(e))
+            return False
+
+        if progress is None or progress.done:
+            self.finish_import(progress)
+            return False
+
+        if progress.fraction is None:
+            self.import_progress.pulse()
+        else:
+            self.import_progress.set_fraction(progress.fraction)
+        return True
+
+
+    def finish_import(self, progress: Optional[ImportProgress]):
+        """
+        Update the views after an import and report its result.
+        """
+        self.import_steps = None
+        self.import_progress.hide()
+        self.import_button.set_sensitive(True)
+        self.export_button.set_sensitive(True)
+
+        # Show the imported people:
+        if len(self.people) > self.import_start:
+            self.set_people_model()
+            self.emit("contacts_imported", self.import_start)
+
+        if progress is None:
+            return
+        summary = "Imported " + str(progress.imported) + " of " \
+                  + str(progress.records) + " contacts."
+        details = []
+        if progress.duplicates > 0:
+            details.append(str(progress.duplicates) + " contacts were "
+                           "already known.")
+        if progress.error_count > 0:
+            details.append(str(progress.error_count) + " contacts could "
+                           "not be imported:")
+            for error in progress.errors[:IMPORT_ERRORS_SHOWN]:
+                details.append("  record " + str(error.record + 1) + " ("
+                               + error.name + "): " + error.message)
+        self.show_message(
+            Gtk.MessageType.INFO if progress.error_count == 0
+                else Gtk.MessageType.WARNING,
+            summary,
+            "\n".join(details) if len(details) > 0 else None
+        )
+
+
+    def on_export_clicked(self, button):
+        """
+        Export the contacts to a vCard or CSV file.
+        """
+        if self.contacts is None:
+            return
+        path = self.select_contacts_file("Export contacts",
+                                         Gtk.FileChooserAction.SAVE,
+                                         Gtk.STOCK_SAVE)
+        if path is None:
+            return
+        if path.suffix.lower() not in VCARD_SUFFIXES + CSV_SUFFIXES:
+            path = path.with_suffix(".vcf")
+        try:
+            export_file(self.contacts, path)
+        except (OSError, ValueError) as e:
+            self.show_message(Gtk.MessageType.ERROR,
+                              "Could not export the contacts.", str(e))
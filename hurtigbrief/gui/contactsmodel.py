@@ -0,0 +1,210 @@
+# A lazy tree model of the contacts.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from .gtk import Gtk, GObject
+from ..abstraction.person import Person
+from collections import OrderedDict
+from collections.abc import MutableSequence
+from typing import Dict, List, Optional, Tuple
+
+# Number of formatted rows kept in memory:
+ROW_CACHE_SIZE = 1024
+
+Row = Tuple[str, str, str, str]
+
+# The columns beyond the displayed text: the problem of an invalid row
+# (shown as its tooltip) and the background color of the row:
+ERROR_COLUMN = 4
+BACKGROUND_COLUMN = 5
+INVALID_BACKGROUND = "#f4c7c3"
+
+
+def format_person(person: Person) -> Row:
+    """
+    The displayed columns of a person: name, address, e-mail, and phone.
+    """
+    return (person.name, ", ".join(person.address.compose()),
+            person.email or "", person.phone or "")
+
+
+class ContactsTreeModel(GObject.Object, Gtk.TreeModel):
+    """
+    A list model of the people in a contact list, followed by an empty
+    row for entering a new person.
+
+    Rows are materialized and formatted only when the view requests them,
+    i.e. when they become visible, and a bounded number of formatted rows
+    is cached. Rows that have been edited but do not (yet) form a valid
+    person are kept as pending text, along with a description of the
+    problem if it is known.
+    """
+    people: MutableSequence
+    pending: Dict[int, List[str]]
+    errors: Dict[int, str]
+
+    def __init__(self, people: MutableSequence):
+        super().__init__()
+        self.people = people
+        self.n_people = len(people)
+        self.pending = dict()
+        self.errors = dict()
+        self.rows = OrderedDict()
+        self.stamp = id(self) & 0x7fffffff
+
+    #
+    # Access from the dialog:
+    #
+    def __len__(self) -> int:
+        return self.n_people + 1
+
+    def get_row(self, row: int) -> Row:
+        """
+        The text of a row.
+        """
+        pending = self.pending.get(row)
+        if pending is not None:
+            return tuple(pending)
+        if row == self.n_people:
+            return ("", "", "", "")
+        values = self.rows.get(row)
+        if values is None:
+            values = format_person(self.people[row])
+            self.rows[row] = values
+            if len(self.rows) > ROW_CACHE_SIZE:
+                self.rows.popitem(last=False)
+        else:
+            self.rows.move_to_end(row)
+        return values
+
+    def set_text(self, row: int, column: int, text: str):
+        """
+        Set the text of a cell that has been edited.
+        """
+        values = list(self.get_row(row))
+        values[column] = text
+        self.pending[row] = values
+        self._emit_changed(row)
+
+    def set_error(self, row: int, message: Optional[str]):
+        """
+        Mark a row as invalid because of `message`, or as valid if the
+        message is None.
+        """
+        if message is None:
+            if self.errors.pop(row, None) is None:
+                return
+        else:
+            self.errors[row] = message
+        self._emit_changed(row)
+
+    def person_changed(self, row: int):
+        """
+        Update a row after the person at that row has changed (or a
+        new person has been appended).
+        """
+        self.pending.pop(row, None)
+        self.errors.pop(row, None)
+        self.rows.pop(row, None)
+        self._emit_changed(row)
+        n_people = len(self.people)
+        while self.n_people < n_people:
+            # The empty row became a person. Append a new empty row:
+            self.n_people += 1
+            path = Gtk.TreePath((self.n_people,))
+            self.row_inserted(path, self._iter(self.n_people))
+
+    def _emit_changed(self, row: int):
+        self.row_changed(Gtk.TreePath((row,)), self._iter(row))
+
+    #
+    # The Gtk.TreeModel interface:
+    #
+    def _iter(self, row: int) -> Gtk.TreeIter:
+        it = Gtk.TreeIter()
+        it.stamp = self.stamp
+        # Offset by one so that the first row is not a NULL pointer:
+        it.user_data = row + 1
+        return it
+
+    @staticmethod
+    def _row(it: Gtk.TreeIter) -> int:
+        return it.user_data - 1
+
+    def do_get_flags(self):
+        return Gtk.TreeModelFlags.LIST_ONLY | Gtk.TreeModelFlags.ITERS_PERSIST
+
+    def do_get_n_columns(self):
+        return 6
+
+    def do_get_column_type(self, column):
+        return GObject.TYPE_STRING
+
+    def do_get_iter(self, path):
+        indices = path.get_indices()
+        if len(indices) != 1 or indices[0] < 0 or indices[0] >= len(self):
+            return (False, None)
+        return (True, self._iter(indices[0]))
+
+    def do_get_path(self, it):
+        return Gtk.TreePath((self._row(it),))
+
+    def do_get_value(self, it, column):
+        row = self._row(it)
+        if column == ERROR_COLUMN:
+            return self.errors.get(row)
+        if column == BACKGROUND_COLUMN:
+            return INVALID_BACKGROUND if row in self.errors else None
+        return self.get_row(row)[column]
+
+    def do_iter_next(self, it):
+        row = self._row(it) + 1
+        if row >= len(self):
+            it.stamp = 0
+            return False
+        it.user_data = row + 1
+        return True
+
+    def do_iter_previous(self, it):
+        row = self._row(it) - 1
+        if row < 0:
+            it.stamp = 0
+            return False
+        it.user_data = row + 1
+        return True
+
+    def do_iter_children(self, parent):
+        if parent is None and len(self) > 0:
+            return (True, self._iter(0))
+        return (False, None)
+
+    def do_iter_has_child(self, it):
+        return False
+
+    def do_iter_n_children(self, it):
+        if it is None:
+            return len(self)
+        return 0
+
+    def do_iter_nth_child(self, parent, n):
+        if parent is None and 0 <= n < len(self):
+            return (True, self._iter(n))
+        return (False, None)
+
+    def do_iter_parent(self, child):
+        return (False, None)
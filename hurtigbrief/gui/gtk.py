@@ -21,9 +21,19 @@ import gi
 gi.require_version("Gtk", "3.0")
 gi.require_version("GtkSource", "4")
 gi.require_version("EvinceView", "3.0")
-from gi.repository import Gtk, GtkSource, EvinceView, GObject, EvinceDocument
+from gi.repository import Gtk, GtkSource, EvinceView, GObject, EvinceDocument, \
+                          GLib
 
 #
-# Initialize EvinceDocument:
+# EvinceDocument is initialized when the first PDF view is created:
 #
-EvinceDocument.init()
+_evince_initialized = False
+
+def init_evince():
+    """
+    Initialize EvinceDocument (once).
+    """
+    global _evince_initialized
+    if not _evince_initialized:
+        EvinceDocument.init()
+        _evince_initialized = True
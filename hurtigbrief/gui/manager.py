@@ -17,105 +17,89 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from .task import LatexTask, TaskResult
-from .gtk import GObject
-from .types import TemplateName
-from .notify import Notify
+from .gtk import GObject, GLib
+from ..core.types import TemplateName
+from ..core.task import TaskResult
+from ..core.taskloop import TaskLoop, Backend
 from ..abstraction import Letter, Design
 from ..latex.workspace import Workspace
 from ..latex.preamblecache import PreambleCache
-from typing import Optional, Tuple
-from warnings import warn
-from threading import Thread, Timer
-from queue import Queue
-from datetime import datetime
-
-class TaskLoop(Thread):
-    """
-    A loop that receives jobs and starts latex tasks one at a time.
-    """
-    def __init__(self, queue: Queue, manager: "TaskManager",
-                 workspace: Workspace, preamble_cache: PreambleCache):
-        # Set it as a daemon thread:
-        super().__init__(daemon=True)
-        self.notify = Notify()
-        self.queue = queue
-        self.manager = manager
-        self.workspace = workspace
-        self.preamble_cache = preamble_cache
-
-    def run(self):
-        while True:
-            # Get a new job, the most recent entry in the job queue:
-            letter, design, template = self.queue.get()
-            while not self.queue.empty():
-                self.queue.task_done()
-                letter, design, template = self.queue.get()
-
-            # Start a new task and wait for it to finish:
-            job = LatexTask(letter, design, template, self.workspace,
-                            self.preamble_cache)
-            job.notify.connect("notify_result", self.manager.receive_result)
-            t0 = datetime.now()
-            job.start()
-            job.join()
-            t1 = datetime.now()
-
-            # Finish that task.
-            self.queue.task_done()
-            self.notify.emit("notify_compile_time", (t1-t0).total_seconds())
+from typing import Optional
+from time import monotonic
 
 
 class TaskManager(GObject.GObject):
     """
     Manage the LaTeX task(s).
-    """
-    task: Optional[LatexTask]
 
+    Submitted jobs are debounced: each submission replaces the previous,
+    not yet started one and restarts its delay. If a maximum wait is
+    given, the job starts at the latest that long after the first
+    submission since the last start, so that continuous edits still
+    lead to regular compilations.
+
+    The letters are compiled in a thread of this process or, with the
+    "process" backend, in a worker process that is restarted if it dies.
+    This class adapts the GUI-agnostic `TaskLoop` to GObject signals,
+    which are emitted from the GLib main loop.
+    """
     __gsignals__ = {
         "notify_result" : (GObject.SIGNAL_RUN_FIRST, None, (object,)),
-        "notify_compile_time" : (GObject.SIGNAL_RUN_FIRST, None, (object,))
+        "notify_compile_time" : (GObject.SIGNAL_RUN_FIRST, None, (object,)),
+        "notify_error" : (GObject.SIGNAL_RUN_FIRST, None, (object,))
     }
 
-    def __init__(self, workspace: Workspace, preamble_cache: PreambleCache):
+    def __init__(self, workspace: Workspace, preamble_cache: PreambleCache,
+                 backend: Backend = "thread"):
         super().__init__()
-        self.task = None
         self.workspace = workspace
         self.preamble_cache = preamble_cache
-        self.queue = Queue()
-        self.task_loop = TaskLoop(self.queue, self, workspace, preamble_cache)
+        self.backend = backend
+        self.task_loop = TaskLoop(workspace, preamble_cache,
+                                  self.receive_result, self.receive_error,
+                                  backend)
         self.task_loop.start()
-        self.timer = None
 
     def submit(self, delay: float, letter: Letter, design: Design,
-               template: TemplateName):
+               template: TemplateName, max_wait: Optional[float] = None):
         """
-        Submit a job for execution.
+        Submit a job for execution after `delay` seconds, or at the
+        latest `max_wait` seconds after the first pending submission.
         """
-        # A later-executed job submission:
-        def submission():
-            self.start((letter, design, template))
-        if self.timer is not None:
-            self.timer.cancel()
-        self.timer = Timer(delay, submission)
-        self.timer.start()
+        self.task_loop.submit((letter, design, template, monotonic()), delay,
+                              max_wait)
 
-    def start(self, job: Tuple[Letter, Design, TemplateName]):
+    def prewarm(self, letter: Letter, design: Design,
+                template: TemplateName):
         """
-        Start a job.
+        Build the preamble format of a letter in the background.
         """
-        self.queue.put(job)
+        self.task_loop.prewarm(letter, design, template)
 
-    def receive_result(self, notification: Notify, result: TaskResult):
+    def cancel(self) -> bool:
         """
-        Receive the results of a task.
+        Drop the pending job, if any.
         """
-        self.task = None
-        self.emit("notify_result", result)
+        return self.task_loop.cancel()
+
+    def receive_result(self, result: TaskResult):
+        """
+        Receive the results of a task (in the task loop).
+        """
+        GLib.idle_add(self._emit_result, result)
 
-    def receive_compile_time(self, compile_time: float):
+    def receive_error(self, error: Exception):
         """
-        Receive the runtime of the LaTeX compilation in seconds.
+        Receive the error of a failed task (in the task loop).
         """
-        self.emit("notify_compile_time", compile_time)
+        GLib.idle_add(self._emit_error, error)
+
+    def _emit_result(self, result: TaskResult) -> bool:
+        self.emit("notify_result", result)
+        if result.sample is not None:
+            self.emit("notify_compile_time", result.sample)
+        return False
 
+    def _emit_error(self, error: Exception) -> bool:
+        self.emit("notify_error", error)
+        return False
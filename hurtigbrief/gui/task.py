@@ -17,48 +17,5 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from ..abstraction.letter import Letter
-from ..abstraction.design import Design
-from ..latex.mklatex import do_latex
-from ..latex.workspace import Workspace
-from ..latex.preamblecache import PreambleCache
-from .types import TemplateName
-from .gtk import GObject
-from .notify import Notify
-from threading import Thread
-from pathlib import Path
-
-class TaskResult:
-    """
-    Result of a LaTeX task.
-    """
-    document_path: str
-
-    def __init__(self, document_path: str):
-        self.document_path = str(document_path)
-
-    def __repr__(self) -> str:
-        return "TaskResult('" + self.document_path + "')"
-
-
-class LatexTask(Thread):
-    """
-    A latex compilation job executed in a separate thread.
-    """
-    def __init__(self, letter: Letter, design: Design, template: TemplateName,
-                 workspace: Workspace, preamble_cache: PreambleCache):
-        super().__init__(daemon=True)
-        self.letter = letter
-        self.design = design
-        self.template = template
-        self.workspace = workspace
-        self.preamble_cache = preamble_cache
-        self.notify = Notify()
-
-    def run(self):
-        do_latex(self.letter, self.design, self.template, self.workspace,
-                 self.preamble_cache, output_to_workspace=True)
-        fullpath = str((Path(self.workspace.directory.name)
-                        / "letter.pdf").resolve())
-        uri = "file://" + fullpath
-        self.notify.emit_result(TaskResult(uri))
+# Moved to the GUI-agnostic core package; kept for compatibility:
+from ..core.task import LatexTask, TaskResult
@@ -17,6 +17,5 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Literal
-
-TemplateName = Literal["scrletter"]
+# Moved to the GUI-agnostic core package; kept for compatibility:
+from ..core.types import TemplateName
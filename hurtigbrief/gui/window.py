@@ -17,21 +17,30 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from .gtk import Gtk, GtkSource, EvinceView, GObject, EvinceDocument
-from .config import default, save_contacts
-from .types import TemplateName
-from .task import TaskResult
+from .gtk import Gtk, GtkSource, EvinceView, GObject, EvinceDocument, GLib, \
+                  init_evince
+from .config import config, save_contacts
+from ..core.types import TemplateName
+from ..core.task import TaskResult
+from ..core.latency import LatencyHistogram
 from .contacts import ContactsDialog
 from ..abstraction.address import address_from_json
 from ..abstraction.person import Person
 from ..abstraction.letter import Letter
-from ..abstraction.design import Design
-from typing import Optional
+from ..abstraction.design import Design, BODY_FORMATS
+from ..contacts.search import ContactSearchIndex
+from typing import List, Optional
 from importlib.resources import files
 from pathlib import Path
 from shutil import copyfile
+from threading import Thread
+from time import monotonic
 import json
 
+# Interval (in milliseconds) at which the preview staleness is updated
+# while compiling:
+STALENESS_INTERVAL = 500
+
 
 class HurtigbriefWindow(Gtk.ApplicationWindow):
     """
@@ -47,13 +56,12 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
     def __init__(self, application=None):
         super().__init__(application=application)
 
-        # Some variables:
-        self.addresses = [address_from_json(json)
-                          for json in default["addresses"]]
-        self.people = [Person.from_json(json, self.addresses)
-                       for json in default["people"]]
-        self.p2i = {p : i for i,p in enumerate(self.people)}
-        default_sender = default["default_sender"]
+        # Some variables. Addresses and people are read lazily from the
+        # contact store:
+        self.contacts = config.contacts
+        self.addresses = self.contacts.addresses
+        self.people = self.contacts.people
+        default_sender = self.contacts.default_sender
         if default_sender is not None:
             default_sender = int(default_sender)
             if default_sender >= 0 and default_sender < len(self.people):
@@ -63,58 +71,48 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         else:
             self.sender = None
         self.default_sender = default_sender
-        print("addresses:", self.addresses)
-
-        # Use this information to enable or disable the 'Save Contacts'
-        # button:
-        self.contacts_hash = self.compute_contacts_hash()
 
         self.document_path = None
         self.document = None
 
+        # (Monotonic) times of the latest edit and of the edit shown in
+        # the preview:
+        self.last_edit_time = None
+        self.preview_edit_time = None
+        self.staleness_timer = None
+
+        # Latencies from the last edit to the updated preview, and the
+        # edit whose latency was recorded last:
+        self.latency = LatencyHistogram()
+        self.latency_edit_time = None
+
         # No default destination for a new letter.
         self.destination = None
 
+        # The text of the editor buffers, by buffer id:
+        self.buffer_texts = dict()
+
         # The signal handlers that react on changed GUI components
         # (we need to deactivate them when loading a letter so as not to
         # trigger too many calls to generate_letter at the same time)
         self.gui_handlers = dict()
 
-        # Header bar:
-        icon_load_letter = Gtk.Image.new_from_file(
-             str(files('hurtigbrief.gui.icons').joinpath('load-letter.svg'))
-        )
-        icon_letter = Gtk.Image.new_from_file(
-             str(files('hurtigbrief.gui.icons').joinpath('save-letter.svg'))
-        )
-        icon_pdf = Gtk.Image.new_from_file(
-             str(files('hurtigbrief.gui.icons').joinpath('save-pdf.svg'))
-        )
-        icon_tex = Gtk.Image.new_from_file(
-             str(files('hurtigbrief.gui.icons').joinpath('save-tex.svg'))
-        )
-        icon_contacts = Gtk.Image.new_from_file(
-             str(files('hurtigbrief.gui.icons').joinpath('save-contacts.svg'))
-        )
+        # Header bar. The icons are loaded once the window is shown:
         self.header_bar = Gtk.HeaderBar(title="Hurtigbrief")
         self.header_bar.set_show_close_button(True)
         self.load_letter_button = Gtk.Button(tooltip_text='Load letter')
-        self.load_letter_button.set_image(icon_load_letter)
         self.load_letter_button.connect("clicked", self.on_load_letter_clicked)
         self.save_letter_button = Gtk.Button(tooltip_text='Save letter')
-        self.save_letter_button.set_image(icon_letter)
         self.save_letter_button.connect("clicked", self.on_save_letter_clicked)
         self.save_pdf_button = Gtk.Button(tooltip_text='Save PDF')
-        self.save_pdf_button.set_image(icon_pdf)
         self.save_pdf_button.set_sensitive(False)
         self.save_pdf_button.connect("clicked", self.on_save_pdf_clicked)
         self.save_tex_button = Gtk.Button(tooltip_text='Export Latex document')
-        self.save_tex_button.set_image(icon_tex)
         self.save_tex_button.set_sensitive(False)
         self.save_tex_button.connect("clicked", self.on_save_tex_clicked)
         self.save_contacts_button = Gtk.Button(tooltip_text='Save contacts')
-        self.save_contacts_button.set_image(icon_contacts)
-        self.save_contacts_button.set_sensitive(False)
+        # Unsaved edits may have been replayed from the contact journal:
+        self.save_contacts_button.set_sensitive(self.contacts.dirty)
         self.save_contacts_button.connect("clicked",
                                           self.on_save_contacts_clicked)
         self.header_bar.pack_start(self.load_letter_button)
@@ -140,16 +138,17 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         layout_left = Gtk.Grid(column_homogeneous=False)
         layout.add1(layout_left)
 
-        # The addresses:
-        self.name_model = self.generate_contact_list_model()
+        # The addresses. The names of the contacts are read in a
+        # background thread once the window is shown, and changes to the
+        # contacts until then are recorded in `name_model_pending`:
+        self.name_model = Gtk.ListStore(str)
+        self.name_model_pending = set()
         label_sender = Gtk.Label('From:', halign=Gtk.Align.START)
         layout_left.attach(label_sender, 0, 0, 1, 1)
         self.cb_sender = Gtk.ComboBox.new_with_model(self.name_model)
         renderer = Gtk.CellRendererText()
         self.cb_sender.pack_start(renderer, True)
         self.cb_sender.add_attribute(renderer, 'text', 0)
-        if self.sender is not None:
-            self.cb_sender.set_active(self.sender)
         layout_left.attach(self.cb_sender, 1, 0, 1, 1)
         label_destination = Gtk.Label('To:', halign=Gtk.Align.START)
         layout_left.attach(label_destination, 0, 1, 1, 1)
@@ -175,16 +174,39 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
 
         # Eat space:
         space_eater = Gtk.Label("")
-        layout_left.attach(space_eater, 3, 0, 1, 2)
+        layout_left.attach(space_eater, 3, 0, 1, 1)
         space_eater.set_hexpand(True)
 
+        # Search-as-you-type recipient picker. The search index is built
+        # in a background thread; until it is ready, recipients are
+        # searched by name prefix in the contact store:
+        self.search_index = None
+        self.search_index_pending = set()
+        self.recipient_model = Gtk.ListStore(str, int)
+        completion = Gtk.EntryCompletion(model=self.recipient_model)
+        completion.set_text_column(0)
+        completion.set_minimum_key_length(1)
+        # The model contains only matching recipients:
+        completion.set_match_func(lambda *args: True)
+        completion.connect("match-selected", self.on_recipient_selected)
+        self.recipient_search = Gtk.SearchEntry()
+        self.recipient_search.set_placeholder_text("Search recipient")
+        self.recipient_search.set_completion(completion)
+        self.recipient_search.connect("changed",
+                                      self.on_recipient_search_changed)
+        layout_left.attach(self.recipient_search, 3, 1, 1, 1)
+
         # The subject:
         try:
             languages = GtkSource.LanguageManager()
             language = languages.get_language('latex')
         except:
+            languages = None
             language = None
+        self.languages = languages
+        self.latex_language = language
         self.subject_buffer = GtkSource.Buffer(language=language)
+        self.subject_buffer.connect('changed', self.on_buffer_changed)
         h2 = self.subject_buffer.connect('changed', self.on_letter_changed)
         self.gui_handlers[id(self.subject_buffer)] = h2
         self.subject_edit = GtkSource.View(buffer=self.subject_buffer)
@@ -192,7 +214,8 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
 
         # The opening:
         self.opening_buffer = GtkSource.Buffer(language=language)
-        self.opening_buffer.set_text(default['opening'])
+        self.opening_buffer.set_text(config['opening'])
+        self.opening_buffer.connect('changed', self.on_buffer_changed)
         h3 = self.opening_buffer.connect('changed', self.on_letter_changed)
         self.gui_handlers[id(self.opening_buffer)] = h3
         self.opening_edit = GtkSource.View(buffer=self.opening_buffer)
@@ -201,6 +224,7 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         # The main body text source view:
         bodyscroll = Gtk.ScrolledWindow()
         self.body_buffer = GtkSource.Buffer(language=language)
+        self.body_buffer.connect('changed', self.on_buffer_changed)
         h4 = self.body_buffer.connect('changed', self.on_letter_changed)
         self.gui_handlers[id(self.body_buffer)] = h4
         self.body_edit = GtkSource.View(buffer=self.body_buffer, expand = True)
@@ -209,7 +233,8 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
 
         # The closing:
         self.closing_buffer = GtkSource.Buffer(language=language)
-        self.closing_buffer.set_text(default['closing'])
+        self.closing_buffer.set_text(config['closing'])
+        self.closing_buffer.connect('changed', self.on_buffer_changed)
         h5 = self.closing_buffer.connect('changed', self.on_letter_changed)
         self.gui_handlers[id(self.closing_buffer)] = h5
         self.closing_edit = GtkSource.View(buffer=self.closing_buffer)
@@ -219,6 +244,7 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         self.signature_buffer = GtkSource.Buffer(language=language)
         if self.sender is not None:
             self.signature_buffer.set_text(self.people[self.sender].name)
+        self.signature_buffer.connect('changed', self.on_buffer_changed)
         h6 = self.signature_buffer.connect('changed', self.on_letter_changed)
         self.gui_handlers[id(self.signature_buffer)] = h6
         self.signature_edit = GtkSource.View(buffer=self.signature_buffer)
@@ -234,13 +260,12 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         layout_left.attach(self.signature_edit, 0, 6, 2, 1)
         layout_left.attach(self.signature_from_sender_button, 2, 6, 2, 1)
 
-        # The PDF view:
-        self.pdf_document_model = EvinceView.DocumentModel()
-        self.pdf_view = EvinceView.View(expand = True)
-        self.pdf_view.set_model(self.pdf_document_model)
+        # The PDF view is created once the window is shown:
+        self.pdf_document_model = None
+        self.pdf_view = None
         evscroll = Gtk.ScrolledWindow()
-        evscroll.add(self.pdf_view)
         layout.add2(evscroll)
+        self.evscroll = evscroll
 
         # The progress bar:
         progress_layout = Gtk.Box()
@@ -248,8 +273,20 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         progress_layout.pack_start(self.spinner, False, False, 0)
         self.spinner_label = Gtk.Label("", halign=Gtk.Align.START)
         progress_layout.pack_start(self.spinner_label, True, True, 0)
+        self.latency_button = Gtk.Button(label="", relief=Gtk.ReliefStyle.NONE)
+        self.latency_button.set_sensitive(False)
+        self.latency_button.connect("clicked", self.on_export_latency_clicked)
+        progress_layout.pack_end(self.latency_button, False, False, 0)
         layout_left.attach(progress_layout, 0, 7, 2, 1)
 
+        # Whether the body is written in Markdown:
+        self.body_format = "latex"
+        self.markdown_button = Gtk.CheckButton('Markdown')
+        self.markdown_button.set_active(False)
+        h8 = self.markdown_button.connect('toggled', self.on_markdown_toggled)
+        self.gui_handlers[id(self.markdown_button)] = h8
+        layout_left.attach(self.markdown_button, 2, 7, 2, 1)
+
         self.add(layout)
 
         self.show_all()
@@ -271,25 +308,103 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         evscroll.set_size_request(round(font_height * 45),
                                   round(font_height * 40))
 
+        # Everything not needed to edit the letter is set up after the
+        # first frame has been drawn (idle callbacks have a lower
+        # priority than redrawing):
+        GLib.idle_add(self.load_header_icons)
+        GLib.idle_add(self.start_loading_contacts)
+        GLib.idle_add(self.create_pdf_view)
+
+        # The contacts dialog is created when first shown:
+        self.contacts_dialog = None
+
+
+    def load_header_icons(self) -> bool:
+        """
+        Load the icons of the header bar buttons.
+        """
+        icons = files('hurtigbrief.gui.icons')
+        for button, icon in ((self.load_letter_button, 'load-letter.svg'),
+                             (self.save_letter_button, 'save-letter.svg'),
+                             (self.save_pdf_button, 'save-pdf.svg'),
+                             (self.save_tex_button, 'save-tex.svg'),
+                             (self.save_contacts_button, 'save-contacts.svg')):
+            button.set_image(
+                Gtk.Image.new_from_file(str(icons.joinpath(icon)))
+            )
+        return False
+
+
+    def start_loading_contacts(self) -> bool:
+        """
+        Start reading the contacts in a background thread.
+        """
+        Thread(target=self.load_contacts, daemon=True).start()
+        return False
+
 
-    def compute_contacts_hash(self):
+    def create_pdf_view(self) -> bool:
         """
-        Compute a hash that identifies the current contact information.
+        Create the PDF view (once).
         """
-        return hash((self.default_sender, tuple(self.addresses),
-                     tuple(self.people)))
+        if self.pdf_view is None:
+            init_evince()
+            self.pdf_document_model = EvinceView.DocumentModel()
+            self.pdf_view = EvinceView.View(expand = True)
+            self.pdf_view.set_model(self.pdf_document_model)
+            self.evscroll.add(self.pdf_view)
+            self.pdf_view.show()
+        return False
 
 
-    def generate_contact_list_model(self):
+    def generate_contact_list_model(self, names: List[str]):
         """
-        Generates a GtkListStore model from the list of addresses.
+        Generates a GtkListStore model from the list of names.
         """
         model = Gtk.ListStore(str)
-        for p in self.people:
-            model.append((p.name,))
+        for name in names:
+            model.append((name,))
         return model
 
 
+    def update_contact_name(self, p_id: int):
+        """
+        Update the name of a changed or appended person in the name model.
+        """
+        if self.name_model_pending is not None:
+            # Names not yet loaded.
+            self.name_model_pending.add(p_id)
+        elif p_id == self.name_model.iter_n_children():
+            # New row.
+            self.name_model.append((self.people[p_id].name,))
+        else:
+            # Existing row:
+            it = self.name_model.get_iter(p_id)
+            self.name_model.set(it, 0, self.people[p_id].name)
+
+
+    def buffer_text(self, buffer: GtkSource.Buffer) -> str:
+        """
+        The text of a buffer, extracted only if it changed since the last
+        extraction.
+        """
+        text = self.buffer_texts.get(id(buffer))
+        if text is None:
+            text = buffer.get_text(buffer.get_start_iter(),
+                                   buffer.get_end_iter(), False)
+            self.buffer_texts[id(buffer)] = text
+        return text
+
+
+    def on_buffer_changed(self, buffer: GtkSource.Buffer):
+        """
+        Invalidate the extracted text of a changed buffer. This handler is
+        never blocked, and is connected before the handlers that
+        regenerate the letter.
+        """
+        self.buffer_texts.pop(id(buffer), None)
+
+
     def get_letter_content(self):
         """
         Compose the letter from the GUI element content.
@@ -301,51 +416,51 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         if destination is not None:
             destination = self.people[destination]
 
-        # Content of the text editors:
-        subject = self.subject_buffer.get_text(
-            self.subject_buffer.get_start_iter(),
-            self.subject_buffer.get_end_iter(),
-            False
-        )
-        opening = self.opening_buffer.get_text(
-            self.opening_buffer.get_start_iter(),
-            self.opening_buffer.get_end_iter(),
-            False
-        )
-        body = self.body_buffer.get_text(
-            self.body_buffer.get_start_iter(),
-            self.body_buffer.get_end_iter(),
-            False
-        )
-        closing = self.closing_buffer.get_text(
-            self.closing_buffer.get_start_iter(),
-            self.closing_buffer.get_end_iter(),
-            False
-        )
+        # Content of the text editors. Only the text of the buffers that
+        # changed since the last call is extracted:
+        subject = self.buffer_text(self.subject_buffer)
+        opening = self.buffer_text(self.opening_buffer)
+        body = self.buffer_text(self.body_buffer)
+        closing = self.buffer_text(self.closing_buffer)
         if self.signature_from_sender_button.get_active():
             # Signature from sender. Set to None, which equals default.
             signature = None
         else:
             # Custom signature given.
-            signature = self.signature_buffer.get_text(
-                self.signature_buffer.get_start_iter(),
-                self.signature_buffer.get_end_iter(),
-                False
-            )
+            signature = self.buffer_text(self.signature_buffer)
 
         return sender, destination, subject, opening, body, closing, signature
 
 
+    def preamble_letter(self) -> Optional[Letter]:
+        """
+        A letter from the sender to themselves. It has the preamble of
+        the letters to come, or is None if no sender is selected.
+        """
+        if self.sender is None:
+            return None
+        sender = self.people[self.sender]
+        if self.signature_from_sender_button.get_active():
+            signature = None
+        else:
+            signature = self.buffer_text(self.signature_buffer)
+        return Letter(sender, sender, "", self.buffer_text(self.opening_buffer),
+                      "", self.buffer_text(self.closing_buffer), signature)
+
+
     def generate_letter(self):
         """
         Generates the letter from the current content.
         """
-        self.sender = self.cb_sender.get_active()
-        if self.sender == -1:
-            self.sender = None
-        self.destination = self.cb_destination.get_active()
-        if self.destination == -1:
-            self.destination = None
+        # Until the names are loaded, the combo boxes are empty and the
+        # selection is kept in `sender` and `destination`:
+        if self.name_model_pending is None:
+            self.sender = self.cb_sender.get_active()
+            if self.sender == -1:
+                self.sender = None
+            self.destination = self.cb_destination.get_active()
+            if self.destination == -1:
+                self.destination = None
         # Early exit if one of the people is not set:
         if self.destination is None or self.sender is None:
             return
@@ -355,13 +470,14 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
            = self.get_letter_content()
 
         # Start the compilation feedback:
+        self.last_edit_time = monotonic()
         self.start_compiling()
 
         # Notify the task manager:
         self.emit("letter_changed",
                   Letter(sender, destination, subject, opening, body, closing,
                          signature),
-                  Design(),
+                  Design(body_format=self.body_format),
                   "scrletter")
 
     def log_error(self, error):
@@ -382,8 +498,11 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         Visual feedback that a LaTeX job is running.
         """
         self.spinner.start()
-        self.spinner_label.set_text(" compiling...")
+        self.update_compiling_label()
         self.save_pdf_button.set_sensitive(False)
+        if self.staleness_timer is None:
+            self.staleness_timer = GLib.timeout_add(STALENESS_INTERVAL,
+                                                    self.on_staleness_timer)
 
     def finish_compiling(self):
         """
@@ -392,6 +511,47 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         self.spinner.stop()
         self.spinner_label.set_text("")
         self.save_pdf_button.set_sensitive(True)
+        if self.staleness_timer is not None:
+            GLib.source_remove(self.staleness_timer)
+            self.staleness_timer = None
+
+    def preview_staleness(self) -> Optional[float]:
+        """
+        Age (in seconds) of the preview if later edits are not yet shown
+        in it, zero if it is up to date, or None if there is no preview.
+        """
+        if self.preview_edit_time is None:
+            return None
+        if self.last_edit_time is None \
+                or self.last_edit_time <= self.preview_edit_time:
+            return 0.0
+        return monotonic() - self.preview_edit_time
+
+    def update_compiling_label(self):
+        """
+        Show the compilation status and the staleness of the preview.
+        """
+        staleness = self.preview_staleness()
+        if staleness is None or staleness < 1.0:
+            self.spinner_label.set_text(" compiling...")
+        else:
+            self.spinner_label.set_text(
+                " compiling... (preview {:.0f} s behind)".format(staleness)
+            )
+
+    def on_staleness_timer(self) -> bool:
+        """
+        Periodically update the staleness of the preview while compiling.
+        """
+        self.update_compiling_label()
+        return True
+
+    def on_compile_error(self, error: Exception):
+        """
+        Report a failed LaTeX task.
+        """
+        self.finish_compiling()
+        self.log_error(error)
 
     def on_receive_result(self, result: TaskResult):
         """
@@ -399,8 +559,15 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         """
         # Stop the spinner:
         self.finish_compiling()
+        if result.edit_time is not None:
+            self.preview_edit_time = result.edit_time
+
+        # Later edits are still to be compiled:
+        if self.preview_staleness():
+            self.start_compiling()
 
         # Load or reload the document:
+        self.create_pdf_view()
         if self.document_path != result.document_path:
             self.document = EvinceDocument.Document.factory_get_document(
                 result.document_path
@@ -411,25 +578,67 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
             self.document.load(self.document_path)
             self.pdf_view.reload()
 
+        # The latency from the last edit, if the preview shows it:
+        if self.last_edit_time is not None \
+                and self.last_edit_time != self.latency_edit_time \
+                and self.preview_staleness() == 0.0:
+            self.latency.record(monotonic() - self.last_edit_time)
+            self.latency_edit_time = self.last_edit_time
+            self.update_latency_readout()
+
+    def update_latency_readout(self):
+        """
+        Show the percentiles of the preview latency.
+        """
+        p = self.latency.percentiles()
+        self.latency_button.set_label(
+            "p50/90/99: {:.1f}/{:.1f}/{:.1f} s".format(p[50.0], p[90.0],
+                                                      p[99.0])
+        )
+        self.latency_button.set_tooltip_text(
+            "Time from the last edit to the updated preview ("
+            + str(self.latency.count) + " previews). Click to export."
+        )
+        self.latency_button.set_sensitive(True)
+
+    def on_export_latency_clicked(self, *args):
+        """
+        Save the preview latency histogram as JSON, e.g. for bug reports.
+        """
+        path = self.select_save_path("latency histogram", "JSON files",
+                                     "*.json", self.default_load_save_dir,
+                                     "hurtigbrief-latency.json")
+        if path is None:
+            return
+        with open(path, 'w') as f:
+            json.dump(self.latency.to_dict(), f, indent=1)
+
     def check_save_contacts_button(self):
         """
         Checks whether the 'Save Contacts' button should be updated.
         """
-        contacts_hash = self.compute_contacts_hash()
-        if self.contacts_hash != contacts_hash:
-            self.save_contacts_button.set_sensitive(True)
+        self.save_contacts_button.set_sensitive(self.contacts.dirty)
 
 
     def show_address_dialog(self, *args):
         """
         Shows a dialog to edit the address book.
         """
-        dialog = ContactsDialog(self)
-        dialog.set_data(self.addresses, self.people, self.default_sender)
-        dialog.connect("person_changed", self.on_person_change)
-        dialog.connect("default_sender_changed", self.on_default_sender_changed)
+        dialog = self.contacts_dialog
+        if dialog is None:
+            dialog = ContactsDialog(self)
+            dialog.set_data(self.addresses, self.people, self.default_sender,
+                            self.contacts)
+            dialog.connect("person_changed", self.on_person_change)
+            dialog.connect("default_sender_changed",
+                           self.on_default_sender_changed)
+            dialog.connect("contacts_imported", self.on_contacts_imported)
+            self.contacts_dialog = dialog
+        else:
+            # People may have been added by loading letters:
+            dialog.set_people_model()
         dialog.run()
-        dialog.destroy()
+        dialog.hide()
 
 
     def on_person_change(self, dialog, p_id: int):
@@ -438,13 +647,13 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         dialog.
         """
         # Update the name model:
-        if p_id == self.name_model.iter_n_children():
-            # New row.
-            self.name_model.append((self.people[p_id].name,))
+        self.update_contact_name(p_id)
+
+        # Update the search index:
+        if self.search_index is None:
+            self.search_index_pending.add(p_id)
         else:
-            # Existing row:
-            it = self.name_model.get_iter(p_id)
-            self.name_model.set(it, 0, self.people[p_id].name)
+            self.search_index.update(p_id, self.people[p_id])
 
         # Check if we need to enable the contacts save button:
         self.check_save_contacts_button()
@@ -455,6 +664,109 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
             self.generate_letter()
 
 
+    def on_contacts_imported(self, dialog, first: int):
+        """
+        This slot is called when people have been imported from the
+        address dialog, starting at index `first`.
+        """
+        for p_id in range(first, len(self.people)):
+            person = self.people[p_id]
+
+            # Extend the name model:
+            self.update_contact_name(p_id)
+
+            # Update the search index:
+            if self.search_index is None:
+                self.search_index_pending.add(p_id)
+            else:
+                self.search_index.update(p_id, person)
+
+        # The import has been committed:
+        self.check_save_contacts_button()
+
+
+    def load_contacts(self):
+        """
+        Read the names of the contacts and build the contact search
+        index (in a background thread).
+        """
+        names = self.contacts.person_names()
+        GLib.idle_add(self.on_names_loaded, names)
+        index = ContactSearchIndex(self.people)
+        GLib.idle_add(self.on_search_index_built, index)
+
+
+    def on_names_loaded(self, names: List[str]):
+        """
+        Install the names read in the background.
+        """
+        # Apply the edits made while the names were read:
+        for p_id in self.name_model_pending:
+            if p_id < len(names):
+                names[p_id] = self.people[p_id].name
+        for p_id in range(len(names), len(self.people)):
+            names.append(self.people[p_id].name)
+        self.name_model_pending = None
+
+        # Fill the model before it is shown:
+        self.name_model = self.generate_contact_list_model(names)
+        with self.cb_sender.handler_block(
+            self.gui_handlers[id(self.cb_sender)]
+        ):
+            self.cb_sender.set_model(self.name_model)
+            if self.sender is not None:
+                self.cb_sender.set_active(self.sender)
+        with self.cb_destination.handler_block(
+            self.gui_handlers[id(self.cb_destination)]
+        ):
+            self.cb_destination.set_model(self.name_model)
+            if self.destination is not None:
+                self.cb_destination.set_active(self.destination)
+        if self.sender is not None and self.destination is not None:
+            self.generate_letter()
+        return False
+
+
+    def on_search_index_built(self, index: ContactSearchIndex):
+        """
+        Install the search index built in the background.
+        """
+        # Apply the edits made while the index was built:
+        for p_id in self.search_index_pending:
+            index.update(p_id, self.people[p_id])
+        self.search_index_pending.clear()
+        self.search_index = index
+        return False
+
+
+    def on_recipient_search_changed(self, entry):
+        """
+        Update the recipient suggestions while the user types.
+        """
+        query = entry.get_text().strip()
+        self.recipient_model.clear()
+        if len(query) == 0:
+            return
+        if self.search_index is not None:
+            matches = self.search_index.search(query, k=10)
+        else:
+            matches = self.contacts.find_people(name=query, limit=10)
+        for p_id in matches:
+            p = self.people[p_id]
+            self.recipient_model.append((p.name + ", " + p.address.city,
+                                         p_id))
+        entry.get_completion().complete()
+
+
+    def on_recipient_selected(self, completion, model, it):
+        """
+        Select a recipient from the search suggestions.
+        """
+        self.cb_destination.set_active(model[it][1])
+        self.recipient_search.set_text("")
+        return True
+
+
     def select_save_path(self, which: str, file_pattern_name: str,
                          file_pattern_glob: str,
                          suggest_folder: Optional[str],
@@ -562,7 +874,7 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         try:
             with open(self.letter_save_path, 'w') as f:
                 json.dump((sender, destination, subject, opening, body,
-                           closing, signature), f)
+                           closing, signature, self.body_format), f)
         except e:
             self.log_error(e)
 
@@ -647,12 +959,25 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
             else:
                 signature = None
 
-        except e:
+            # v0.1.4 format:
+            # The body format was not known before 0.1.4, when all bodies
+            # were written in LaTeX.
+            if len(letter) >= 8:
+                body_format = letter[7]
+            else:
+                body_format = "latex"
+
+        except Exception as e:
             self.log_error(e)
             return
 
-        # A map that links addresses to the location in the address list:
-        a2i = {a : i for i,a in enumerate(self.addresses)}
+        # An unknown body format (e.g. from a corrupted or newer file)
+        # would fail only later when compiling; fall back to LaTeX:
+        if body_format not in BODY_FORMATS:
+            self.log_error("Unknown body format " + repr(body_format)
+                           + " in '" + str(letter_load_path)
+                           + "', using 'latex'.")
+            body_format = "latex"
 
         # Reset the sender and destination so that we can safely call
         # on_person_change without triggering a regeneration on each call:
@@ -662,18 +987,12 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         # Obtain the addresses:
         if sender is not None:
             sender_address = address_from_json(sender["address"])
-            if sender_address in a2i:
-                sai = a2i[sender_address]
-            else:
-                sai = len(self.addresses)
-                self.addresses.append(sender_address)
-            sender["address"] = sai
+            sender["address"] = self.contacts.add_address(sender_address)
 
             # Generate the Person:
             sender = Person.from_json(sender, self.addresses)
-            if sender in self.p2i:
-                si = self.p2i[sender]
-            else:
+            si = self.contacts.person_index(sender)
+            if si is None:
                 si = len(self.people)
                 self.people.append(sender)
 
@@ -683,19 +1002,13 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
 
         if destination is not None:
             destination_address = address_from_json(destination["address"])
-            if destination_address in a2i:
-                dai = a2i[destination_address]
-            else:
-                dai = len(self.addresses)
-                self.addresses.append(destination_address)
-            destination["address"] = dai
+            destination["address"] \
+               = self.contacts.add_address(destination_address)
 
             # Generate the Person:
             destination = Person.from_json(destination, self.addresses)
-            if destination in self.p2i:
-                di = self.p2i[destination]
-                self.destination = self.people[di]
-            else:
+            di = self.contacts.person_index(destination)
+            if di is None:
                 di = len(self.people)
                 self.people.append(destination)
 
@@ -750,6 +1063,12 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
             else:
                 self.signature_from_sender_button.set_active(False)
 
+        with self.markdown_button.handler_block(
+                self.gui_handlers[id(self.markdown_button)]
+        ):
+            self.markdown_button.set_active(body_format == "markdown")
+        self.set_body_format(body_format)
+
         # Generate the letter:
         self.generate_letter()
 
@@ -816,10 +1135,9 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         """
         Saves the contact list.
         """
-        save_contacts(self.default_sender, self.addresses, self.people)
+        save_contacts(self.contacts)
 
         # Disable the button:
-        self.contacts_hash = self.compute_contacts_hash()
         self.save_contacts_button.set_sensitive(False)
 
 
@@ -828,6 +1146,7 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         Connected to the respective signal of the contacts dialog.
         """
         self.default_sender = new_default_sender
+        self.contacts.default_sender = new_default_sender
         self.check_save_contacts_button()
 
 
@@ -856,3 +1175,25 @@ class HurtigbriefWindow(Gtk.ApplicationWindow):
         else:
             # Otherwise, enable the text edit:
             self.signature_edit.set_sensitive(True)
+
+
+    def set_body_format(self, body_format: str):
+        """
+        Set the format in which the body is written.
+        """
+        self.body_format = body_format
+        if self.languages is None:
+            return
+        if body_format == "markdown":
+            language = self.languages.get_language('markdown')
+        else:
+            language = self.latex_language
+        self.body_buffer.set_language(language)
+
+
+    def on_markdown_toggled(self, button):
+        """
+        When the check box "Markdown" is toggled.
+        """
+        self.set_body_format("markdown" if button.get_active() else "latex")
+        self.generate_letter()
@@ -0,0 +1,109 @@
+# Statistics of LaTeX compilations.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import re
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+# The kind of a compilation: engine, template, whether the format file
+# is reused, and the size class of the letter body.
+CompileKind = Tuple[str, str, bool, int]
+
+_OUTPUT_WRITTEN = re.compile(r"Output written on .*?\((\d+) pages?")
+
+
+def size_class(body_length: int) -> int:
+    """
+    Size class of a letter body. Classes grow by factors of four.
+    """
+    return max(int(body_length), 0).bit_length() // 2
+
+
+def compile_kind(engine: str, template: str, format_hit: bool,
+                 body_length: int) -> CompileKind:
+    """
+    The kind of a compilation.
+    """
+    return (str(engine), str(template), bool(format_hit),
+            size_class(body_length))
+
+
+def log_page_count(log: Union[str, Path]) -> Optional[int]:
+    """
+    The number of pages reported in a LaTeX log file, or None if the
+    log cannot be read or reports no output.
+    """
+    try:
+        with open(log, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+    except OSError:
+        return None
+    # The log is wrapped at 79 characters:
+    match = _OUTPUT_WRITTEN.search(text.replace("\n", ""))
+    if match is None:
+        return None
+    return int(match.group(1))
+
+
+class CompileSample:
+    """
+    Measurements of a LaTeX compilation.
+    """
+    engine: str
+    template: str
+    format_hit: bool
+    body_length: int
+    pages: Optional[int]
+    format_seconds: float
+    document_seconds: float
+    substitute_seconds: float
+
+    def __init__(self, engine: str, template: str, format_hit: bool,
+                 body_length: int, pages: Optional[int],
+                 format_seconds: float, document_seconds: float,
+                 substitute_seconds: float = 0.0):
+        self.engine = str(engine)
+        self.template = str(template)
+        self.format_hit = bool(format_hit)
+        self.body_length = int(body_length)
+        self.pages = None if pages is None else int(pages)
+        self.format_seconds = float(format_seconds)
+        self.document_seconds = float(document_seconds)
+        self.substitute_seconds = float(substitute_seconds)
+
+    @property
+    def seconds(self) -> float:
+        """
+        Total compile time.
+        """
+        return self.substitute_seconds + self.format_seconds \
+               + self.document_seconds
+
+    @property
+    def kind(self) -> CompileKind:
+        return compile_kind(self.engine, self.template, self.format_hit,
+                            self.body_length)
+
+    def __repr__(self) -> str:
+        return "CompileSample(" + repr(self.engine) + ", " \
+               + repr(self.template) + ", " + str(self.format_hit) + ", " \
+               + str(self.body_length) + ", " + str(self.pages) + ", " \
+               + "{:.3f}, {:.3f}, {:.4f})".format(self.format_seconds,
+                                                  self.document_seconds,
+                                                  self.substitute_seconds)
@@ -0,0 +1,138 @@
+# Conversion of a lightweight Markdown letter body to LaTeX.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import re
+from hashlib import blake2b
+from threading import Lock
+from collections import OrderedDict
+from typing import List
+
+# Paragraphs are separated by (whitespace-only) blank lines:
+_PARAGRAPH_SEPARATOR = re.compile(r"\n[ \t]*\n")
+
+# List items:
+_ITEMIZE_ITEM = re.compile(r"^[ \t]{0,3}[-*+][ \t]+(.*)$")
+_ENUMERATE_ITEM = re.compile(r"^[ \t]{0,3}\d+[.)][ \t]+(.*)$")
+
+# Inline markup. Backslashes and braces are passed on so that LaTeX
+# commands can still be used within the Markdown body:
+_SPECIAL_CHARACTERS = re.compile(r"(?<!\\)([&%#$])")
+_STRONG = re.compile(r"(?<![\w\\])(\*\*|__)(?=\S)(.+?)(?<=\S)\1(?!\w)")
+_EMPHASIS = re.compile(r"(?<![\w\\*])([*_])(?=\S)(.+?)(?<=\S)\1(?![\w*])")
+_UNDERSCORE = re.compile(r"(?<!\\)_")
+
+
+def convert_inline(text: str) -> str:
+    """
+    Convert the inline markup of a piece of text.
+    """
+    text = _SPECIAL_CHARACTERS.sub(r"\\\1", text)
+    text = _STRONG.sub(r"\\textbf{\2}", text)
+    text = _EMPHASIS.sub(r"\\emph{\2}", text)
+    # Underscores that do not mark emphasis are literal:
+    text = _UNDERSCORE.sub(r"\\_", text)
+    return text
+
+
+def convert_paragraph(paragraph: str) -> str:
+    """
+    Convert a single Markdown paragraph to LaTeX.
+    """
+    lines = []
+    environment = None
+    for line in paragraph.split("\n"):
+        m = _ITEMIZE_ITEM.match(line)
+        item_env = "itemize"
+        if m is None:
+            m = _ENUMERATE_ITEM.match(line)
+            item_env = "enumerate"
+        if m is not None:
+            # A new list item:
+            if environment != item_env:
+                if environment is not None:
+                    lines.append("\\end{" + environment + "}")
+                lines.append("\\begin{" + item_env + "}")
+                environment = item_env
+            lines.append("\\item " + convert_inline(m.group(1)))
+        elif environment is not None and line[:1] in (" ", "\t"):
+            # Continuation of the previous list item:
+            lines.append(convert_inline(line))
+        else:
+            if environment is not None:
+                lines.append("\\end{" + environment + "}")
+                environment = None
+            lines.append(convert_inline(line))
+    if environment is not None:
+        lines.append("\\end{" + environment + "}")
+
+    return "\n".join(lines)
+
+
+def split_paragraphs(body: str) -> List[str]:
+    """
+    Split a body into its paragraphs.
+    """
+    return _PARAGRAPH_SEPARATOR.split(body)
+
+
+class MarkdownConverter:
+    """
+    Converts a Markdown body to LaTeX paragraph by paragraph.
+
+    The conversions of the paragraphs are memoized by digest in a
+    bounded least-recently-used cache, so that only the paragraphs
+    edited since the last conversion need to be converted again.
+    """
+    max_paragraphs: int
+
+    def __init__(self, max_paragraphs: int = 1024):
+        self.max_paragraphs = int(max_paragraphs)
+        self.cache = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def convert_paragraph(self, paragraph: str) -> str:
+        """
+        Convert a single paragraph, using the cache.
+        """
+        digest = blake2b(paragraph.encode(), digest_size=16).digest()
+        with self.lock:
+            latex = self.cache.get(digest)
+            if latex is not None:
+                self.cache.move_to_end(digest)
+                self.hits += 1
+                return latex
+
+        latex = convert_paragraph(paragraph)
+
+        with self.lock:
+            self.misses += 1
+            self.cache[digest] = latex
+            while len(self.cache) > self.max_paragraphs:
+                self.cache.popitem(last=False)
+
+        return latex
+
+    def convert(self, body: str) -> str:
+        """
+        Convert a Markdown body to LaTeX.
+        """
+        return "\n\n".join(self.convert_paragraph(p)
+                           for p in split_paragraphs(body))
@@ -21,47 +21,89 @@ import os
 from pickle import Pickler
 from typing import Literal
 from shutil import move
+from time import perf_counter
 from tempfile import TemporaryDirectory
 from pathlib import Path
 from subprocess import run, CalledProcessError
 from ..abstraction import Letter, Design
-from .templates.scrletter import create_scr_letter
+from .templates.scrletter import create_scr_letter_keyed, \
+                                create_scr_letter_preamble, \
+                                scr_letter_preamble_key
 from .workspace import Workspace
 from .preamblecache import PreambleCache
+from .compilestats import CompileSample, log_page_count
 from .config import latex_cmd
 
 Template = Literal["scrletter"]
 
+def preamble_key(letter: Letter, design: Design, template: Template) -> bytes:
+    """
+    The key of the preamble that compiling a letter would use.
+    """
+    if template == "scrletter":
+        return scr_letter_preamble_key(letter, design)
+    raise NotImplementedError("Invalid template specified.")
+
+
+def warm_preamble(letter: Letter, design: Design, template: Template,
+                  preamble_cache: PreambleCache):
+    """
+    Compile the preamble format of a letter, so that it is cached when
+    the letter (or any letter with the same preamble) is compiled.
+    """
+    if template == "scrletter":
+        key, preamble = create_scr_letter_preamble(letter, design)
+    else:
+        raise NotImplementedError("Invalid template specified.")
+    preamble_cache.get(key, preamble)
+
+
 def do_latex(letter: Letter, design: Design, template: Template,
              workspace: Workspace, preamble_cache: PreambleCache,
-             output_to_workspace: bool = False):
+             output_to_workspace: bool = False) -> CompileSample:
+    """
+    Compile a letter and return the measurements of the compilation.
+    """
     # Depending on the template, generate the latex file:
+    t0 = perf_counter()
     if template == "scrletter":
-        preamble, document = create_scr_letter(letter, design)
+        preamble_key, preamble, document \
+           = create_scr_letter_keyed(letter, design)
     else:
         raise NotImplementedError("Invalid template specified.")
+    ts = perf_counter() - t0
 
-    # Compile the preamble:
-    fmt = preamble_cache[preamble]
+    # Compile the preamble (if any of its tokens changed):
+    # The format is held until LaTeX is done with it, so that compiling
+    # other preambles in the meantime cannot remove it:
+    format_hit = preamble_cache.is_current(preamble_key)
+    t0 = perf_counter()
+    with preamble_cache.use(preamble_key, preamble) as fmt:
+        t1 = perf_counter()
 
-    # Save the LaTeX to a named temporary document:
-    dirpath = Path(workspace.directory.name)
-    tmp_in = dirpath / "letter.tex"
-    tmp_out = dirpath / "letter.pdf"
+        # Save the LaTeX to a named temporary document:
+        dirpath = Path(workspace.directory.name)
+        tmp_in = dirpath / "letter.tex"
+        tmp_out = dirpath / "letter.pdf"
 
-    # Write TeX-file:
-    with open(tmp_in, 'w') as f:
-        f.write(document)
+        # Write TeX-file:
+        with open(tmp_in, 'w') as f:
+            f.write(document)
 
-    # Compile:
-    cmd = [latex_cmd,"-jobname=letter", "-interaction=nonstopmode",
-           "-fmt="+fmt, str(tmp_in.resolve())]
-    try:
-        res = run(cmd, cwd=dirpath, check=True)
-    except CalledProcessError:
-        raise RuntimeError("Compiling the LaTeX document failed.")
+        # Compile:
+        cmd = [latex_cmd,"-jobname=letter", "-interaction=nonstopmode",
+               "-fmt="+fmt, str(tmp_in.resolve())]
+        try:
+            res = run(cmd, cwd=dirpath, check=True)
+        except CalledProcessError:
+            raise RuntimeError("Compiling the LaTeX document failed.")
+        t2 = perf_counter()
 
     # Move the file:
     if not output_to_workspace:
         move(tmp_out, Path(".")/"letter.pdf")
 
+    return CompileSample(latex_cmd, template, format_hit, len(letter.body),
+                         log_page_count(dirpath / "letter.log"), t1 - t0,
+                         t2 - t1, ts)
+
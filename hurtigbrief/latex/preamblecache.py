@@ -18,41 +18,225 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import os
 from pathlib import Path
-from tempfile import NamedTemporaryFile
+from typing import Dict, Hashable, Iterator, Optional, Set
+from collections import OrderedDict
+from contextlib import contextmanager
 from subprocess import run, CalledProcessError
+from threading import Event, Lock
 from .workspace import Workspace
+from ..abstraction.fingerprint import fingerprint_fields
 from .config import latex_cmd
 
+# Number of format files kept in the workspace:
+MAX_FORMATS = 4
+
+
+class _Flight:
+    """
+    A format build in progress. Requests for the same preamble wait for
+    its event and share its outcome.
+    """
+    event: Event
+    error: Optional[BaseException]
+
+    def __init__(self):
+        self.event = Event()
+        self.error = None
+
 
 class PreambleCache:
     """
     Caching of LaTeX macro initialization.
+
+    The cache is safe to use from several threads. Format builds are
+    single-flight per preamble: a request for a preamble that is being
+    built waits for that build instead of building it again, while
+    preambles that differ are built in parallel. If the build fails, its
+    error is raised in all requests that waited for it. Each build writes
+    its own format file under a temporary name and publishes it by an
+    atomic rename, so that a format file is never seen half-written.
+
+    Format files in use (see `use`) are counted. The current format is
+    never evicted, and an evicted format that is still in use is removed
+    only once its last user is done with it.
     """
-    def __init__(self, workspace: Workspace):
-        self.hash = None
+    key: Optional[Hashable]
+    formats: Dict[Hashable, str]
+    building: Dict[Hashable, _Flight]
+    users: Dict[str, int]
+    evicted: Set[str]
+
+    def __init__(self, workspace: Workspace, max_formats: int = MAX_FORMATS):
+        # The key of the most recently requested preamble:
+        self.key = None
         self.workspace = workspace
+        self.max_formats = max_formats
+        self.lock = Lock()
+        # The format files, least recently used first, and the builds
+        # in progress:
+        self.formats = OrderedDict()
+        self.building = dict()
+        self.builds = 0
+        # The number of users of each format file in use, and the
+        # evicted format files that are removed when no longer in use:
+        self.users = dict()
+        self.evicted = set()
 
     def __getitem__(self, preamble: str) -> str:
-        # See if we have cached this preamble:
-        h = hash(preamble)
-        if h != self.hash:
-            # Otherwise create a new ini file from the
-            dirpath = Path(self.workspace.directory.name)
-            tmp_pre = dirpath / "preamble.tex"
-
-            with open(tmp_pre, 'w') as f:
-                f.write(preamble)
-
-            # Ini generation:
-            cmd = [latex_cmd,"-ini","-jobname=\"preamble\"",
-                   "&" + latex_cmd + " " + str(tmp_pre.resolve()) + "\\dump"]
+        return self.get(fingerprint_fields("preamble", preamble), preamble)
+
+    def is_current(self, key: Hashable) -> bool:
+        """
+        Whether the format file of the preamble identified by `key`
+        is cached.
+        """
+        return key == self.key or key in self.formats
+
+    def get(self, key: Hashable, preamble: str) -> str:
+        """
+        Return the format file of a preamble identified by `key`.
+        The preamble is compiled only if no format of `key` is cached
+        or being built.
+
+        The format file may be removed once other formats are built. To
+        run LaTeX with it, hold it by means of `use` instead.
+        """
+        fmt = self._acquire(key, preamble)
+        self._release(fmt)
+        return fmt
+
+    @contextmanager
+    def use(self, key: Hashable, preamble: str) -> Iterator[str]:
+        """
+        Context manager yielding the format file of a preamble identified
+        by `key` (see `get`). The format file is not removed before the
+        context is left.
+        """
+        fmt = self._acquire(key, preamble)
+        try:
+            yield fmt
+        finally:
+            self._release(fmt)
+
+    def _acquire(self, key: Hashable, preamble: str) -> str:
+        """
+        Return the format file of a preamble and count it as in use.
+        """
+        while True:
+            with self.lock:
+                fmt = self.formats.get(key)
+                if fmt is not None:
+                    self.formats.move_to_end(key)
+                    self.key = key
+                    self.users[fmt] = self.users.get(fmt, 0) + 1
+                    return fmt
+                flight = self.building.get(key)
+                if flight is None:
+                    # This request builds the format:
+                    flight = _Flight()
+                    self.building[key] = flight
+                    self.builds += 1
+                    name = "preamble-" + str(self.builds)
+                    break
+            # Wait for the build of the same preamble and share its
+            # failure. Requests after a failed build try again:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+
+        fmt = None
+        try:
+            fmt = self._build(name, preamble)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.building[key]
+                if fmt is not None:
+                    self.formats[key] = fmt
+                    self.key = key
+                    self.users[fmt] = 1
+                    self._evict()
+            flight.event.set()
+        return fmt
+
+    def _build(self, name: str, preamble: str) -> str:
+        """
+        Compile a preamble into the format file `name`.fmt.
+        """
+        dirpath = Path(self.workspace.directory.name)
+        tmp_pre = dirpath / (name + ".tex")
+
+        with open(tmp_pre, 'w') as f:
+            f.write(preamble)
+
+        # Ini generation under a temporary job name:
+        jobname = name + "-building"
+        cmd = [latex_cmd,"-ini","-jobname=\"" + jobname + "\"",
+               "&" + latex_cmd + " " + str(tmp_pre.resolve()) + "\\dump"]
+        try:
             try:
-                res = run(cmd, cwd=dirpath, check=True)
+                run(cmd, cwd=dirpath, check=True)
             except CalledProcessError:
                 raise RuntimeError("LaTeX error in preamble.")
 
-            # Remember the hash
-            self.hash = h
+            # Publish the format file:
+            fmt = (dirpath / name).resolve()
+            os.replace(dirpath / (jobname + ".fmt"), str(fmt) + ".fmt")
+        except BaseException:
+            # Remove the remains of the failed build:
+            for path in [tmp_pre, *dirpath.glob(jobname + ".*")]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            raise
+        return str(fmt)
+
+    def _release(self, fmt: str):
+        """
+        Count one use of a format file as done, and remove the format
+        file if it has been evicted and this was its last use.
+        """
+        with self.lock:
+            self.users[fmt] -= 1
+            if self.users[fmt] > 0:
+                return
+            del self.users[fmt]
+            if fmt not in self.evicted:
+                return
+            self.evicted.remove(fmt)
+        self._remove(fmt)
 
-        return str((Path(self.workspace.directory.name) / "preamble").resolve())
+    def _evict(self):
+        """
+        Evict the least recently used formats beyond the maximum number
+        of formats, sparing the current one. The format files (and their
+        sources) are removed unless they are in use.
+        """
+        excess = len(self.formats) - self.max_formats
+        for key in list(self.formats):
+            if excess <= 0:
+                break
+            if key == self.key:
+                continue
+            fmt = self.formats.pop(key)
+            excess -= 1
+            if fmt in self.users:
+                self.evicted.add(fmt)
+            else:
+                self._remove(fmt)
+
+    @staticmethod
+    def _remove(fmt: str):
+        """
+        Remove a format file and its sources.
+        """
+        for suffix in (".fmt", ".tex", "-building.log"):
+            try:
+                os.remove(fmt + suffix)
+            except OSError:
+                pass
@@ -18,4 +18,5 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from .tokenize import Tokenizer
-from .scrletter import create_scr_letter
+from .scrletter import create_scr_letter, create_scr_letter_keyed, \
+                       create_scr_letter_preamble, scr_letter_preamble_key
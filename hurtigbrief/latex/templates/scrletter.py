@@ -18,9 +18,10 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from pathlib import Path
-from typing import Tuple
-from ...abstraction import Letter, Design
+from typing import Tuple, Dict, Optional
+from ...abstraction import Letter, Design, fingerprint_fields
 from .tokenize import Tokenizer
+from ..markdown import MarkdownConverter
 
 def load_scrletter_template() -> Tuple[str,str]:
     """
@@ -43,14 +44,41 @@ _scrletter_tex, _scrletter_preamble_tex = load_scrletter_template()
 _scrletter_tokenizer = Tokenizer(_scrletter_tex, ALL_TOKENS)
 _scrletter_preamble_tokenizer = Tokenizer(_scrletter_preamble_tex, ALL_TOKENS)
 
-def create_scr_letter(letter: Letter, design: Design) -> Tuple[str,str]:
+# Classify the tokens by the template section in which they occur. Only
+# the tokens of the preamble enter the LaTeX format file, so the format
+# can be reused as long as none of their values change:
+PREAMBLE_TOKENS = tuple(tok for tok in ALL_TOKENS
+                        if tok in _scrletter_preamble_tokenizer.tokens)
+DOCUMENT_TOKENS = tuple(tok for tok in ALL_TOKENS
+                        if tok in _scrletter_tokenizer.tokens)
+
+# The key of a preamble: a fingerprint of the preamble template and the
+# values of all preamble tokens.
+PreambleKey = bytes
+_preamble_digest = fingerprint_fields("scrletter-preamble-template",
+                                      _scrletter_preamble_tex, *ALL_TOKENS)
+
+# Converter of Markdown letter bodies. Its cache persists between letters
+# so that only edited paragraphs are converted anew:
+_markdown_converter = MarkdownConverter()
+
+# The most recently substituted preamble: its token values, key, and text.
+_last_preamble: Tuple[Optional[tuple], Optional[PreambleKey], Optional[str]] \
+   = (None, None, None)
+
+# The most recently converted body (format, source, and LaTeX) and the
+# most recently substituted document (token values and text), so that
+# edits of other fields neither convert the body nor substitute the
+# document anew:
+_last_content: Tuple[Optional[str], Optional[str], Optional[str]] \
+   = (None, None, None)
+_last_document: Tuple[Optional[tuple], Optional[str]] = (None, None)
+
+
+def preamble_token_map(letter: Letter, design: Design) -> Dict[str,str]:
     """
-    Creates a KOMA ScrLetter.
+    Values of the tokens that occur in the scrletter preamble.
     """
-    # Load the template:
-    tex = _scrletter_tex
-
-    # Create the token dictionary:
     token_map = {}
 
     # E-Mail address:
@@ -72,6 +100,41 @@ def create_scr_letter(letter: Letter, design: Design) -> Tuple[str,str]:
     token_map["%%FROMNAME"] = letter.sender.name
     token_map["%%FROMZIPCODE"] = str(letter.sender.address.postalcode)
     token_map["%%FROMADDRESS"] = "\n".join(letter.sender.address.compose())
+
+    # Custom signature:
+    if letter.signature is not None:
+        token_map["%%CUSTOMSIGNATURE"] = \
+           "\\newcommand{\customsignature}{" + letter.signature + "}\n"
+    else:
+        token_map["%%CUSTOMSIGNATURE"] = ""
+
+    # Letter style:
+    token_map["%%FONT"] = design.font
+
+    return token_map
+
+
+def _convert_content(body: str, body_format: str) -> str:
+    """
+    The LaTeX of a letter body.
+    """
+    global _last_content
+    last_format, last_body, content = _last_content
+    if body_format == last_format and body == last_body:
+        return content
+    if body_format == "markdown":
+        content = _markdown_converter.convert(body)
+    else:
+        content = body
+    _last_content = (body_format, body, content)
+    return content
+
+
+def document_token_map(letter: Letter, design: Design) -> Dict[str,str]:
+    """
+    Values of the tokens that occur in the scrletter document body.
+    """
+    token_map = {}
     token_map["%%TOADDRESS"] = letter.destination.compose_address()
 
     # Letter content:
@@ -80,19 +143,75 @@ def create_scr_letter(letter: Letter, design: Design) -> Tuple[str,str]:
         token_map["%%OPENING"] = letter.opening
     else:
         token_map["%%OPENING"] = letter.opening + ","
-    token_map["%%CONTENT"] = letter.body
+    token_map["%%CONTENT"] = _convert_content(letter.body, design.body_format)
     token_map["%%CLOSING"] = letter.closing
 
-    # Custom signature:
-    if letter.signature is not None:
-        token_map["%%CUSTOMSIGNATURE"] = \
-           "\\newcommand{\customsignature}{" + letter.signature + "}\n"
-    else:
-        token_map["%%CUSTOMSIGNATURE"] = ""
+    return token_map
+
+
+def scr_letter_preamble_key(letter: Letter, design: Design) -> PreambleKey:
+    """
+    The key of the preamble of a KOMA ScrLetter, computed without
+    substituting the preamble.
+    """
+    preamble_map = preamble_token_map(letter, design)
+    values = tuple(preamble_map[tok] for tok in PREAMBLE_TOKENS)
+    last_values, key, _ = _last_preamble
+    if values != last_values:
+        key = fingerprint_fields("scrletter-preamble", _preamble_digest,
+                                 *values)
+    return key
 
-    # Letter style:
-    token_map["%%FONT"] = design.font
 
-    return (_scrletter_preamble_tokenizer.substitute(token_map),
-            _scrletter_tokenizer.substitute(token_map))
+def create_scr_letter_preamble(letter: Letter, design: Design) \
+        -> Tuple[PreambleKey, str]:
+    """
+    The key and the preamble of a KOMA ScrLetter. The preamble is
+    substituted only if one of its tokens changed since the last call.
+    """
+    global _last_preamble
+    preamble_map = preamble_token_map(letter, design)
+    values = tuple(preamble_map[tok] for tok in PREAMBLE_TOKENS)
+    last_values, key, preamble = _last_preamble
+    if values != last_values:
+        key = fingerprint_fields("scrletter-preamble", _preamble_digest,
+                                 *values)
+        preamble = _scrletter_preamble_tokenizer.substitute(preamble_map)
+        _last_preamble = (values, key, preamble)
+    return key, preamble
+
+
+def create_scr_letter_keyed(letter: Letter, design: Design) \
+        -> Tuple[PreambleKey, str, str]:
+    """
+    Creates a KOMA ScrLetter and returns the key of its preamble along
+    with the preamble and the document.
+
+    The key is a stable fingerprint of the preamble. If no preamble token
+    value changed since the previous call, the previously substituted
+    preamble and its key are returned without substituting or
+    fingerprinting the preamble anew. Comparing the returned key against
+    a stored key is hence a fast check of whether the preamble is
+    unchanged.
+    """
+    # The preamble:
+    key, preamble = create_scr_letter_preamble(letter, design)
 
+    # The document:
+    global _last_document
+    document_map = document_token_map(letter, design)
+    values = tuple(document_map[tok] for tok in DOCUMENT_TOKENS)
+    last_values, document = _last_document
+    if values != last_values:
+        document = _scrletter_tokenizer.substitute(document_map)
+        _last_document = (values, document)
+
+    return key, preamble, document
+
+
+def create_scr_letter(letter: Letter, design: Design) -> Tuple[str,str]:
+    """
+    Creates a KOMA ScrLetter.
+    """
+    _, preamble, document = create_scr_letter_keyed(letter, design)
+    return preamble, document
@@ -41,6 +41,9 @@ class Tokenizer:
                                    + s[:10])
         self.substitute_list = substitute
 
+        # The set of tokens that occur in this template:
+        self.tokens = frozenset(tok for tok,_ in substitute if tok is not None)
+
     def substitute(self, tokens: dict) -> str:
         """
         Substitutes a token dictionary.
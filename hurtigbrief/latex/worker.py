@@ -0,0 +1,146 @@
+# A LaTeX worker process.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import multiprocessing
+from pathlib import Path
+from typing import Optional, Tuple
+from ..abstraction import Letter, Design
+from .compilestats import CompileSample
+from .workspace import Workspace
+from .preamblecache import PreambleCache
+from .mklatex import do_latex, warm_preamble
+from threading import Lock
+
+
+def _worker_main(connection):
+    """
+    The loop of the worker process: compile the received letters, or
+    only their preamble formats, in a workspace and preamble cache of
+    its own until the connection is closed or `None` is received.
+    """
+    workspace = Workspace()
+    preamble_cache = PreambleCache(workspace)
+    document = str((Path(workspace.directory.name) / "letter.pdf").resolve())
+    while True:
+        try:
+            job = connection.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        what, letter, design, template = job
+        try:
+            if what == "warm":
+                warm_preamble(letter, design, template, preamble_cache)
+                result = None
+            else:
+                sample = do_latex(letter, design, template, workspace,
+                                  preamble_cache, output_to_workspace=True)
+                result = (document, sample)
+        except Exception as e:
+            connection.send(("error", str(e), preamble_cache.key))
+            continue
+        connection.send(("ok", result, preamble_cache.key))
+
+
+class LatexWorker:
+    """
+    Compiles letters in a separate process, so that template
+    substitution, hashing, and process management do not compete with
+    the calling interpreter for its global interpreter lock.
+
+    The worker process is started on the first compilation and is
+    restarted if it dies. Requests from several threads are served one
+    after another, so a compilation requested while the preamble format
+    is warmed up waits for the format.
+    """
+    preamble_key: Optional[bytes]
+
+    def __init__(self, start_method: str = "spawn"):
+        self.context = multiprocessing.get_context(start_method)
+        self.process = None
+        self.connection = None
+        # The key of the preamble format cached in the worker:
+        self.preamble_key = None
+        self.lock = Lock()
+
+    def start(self):
+        """
+        Start a new worker process.
+        """
+        self.close()
+        self.connection, child = self.context.Pipe()
+        self.process = self.context.Process(target=_worker_main,
+                                            args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.preamble_key = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def compile(self, letter: Letter, design: Design, template: str) \
+            -> Tuple[str, CompileSample]:
+        """
+        Compile a letter and return the path of the document and the
+        measurements of the compilation. If the worker dies during the
+        compilation, the letter is compiled once more by a new worker.
+        """
+        return self._request(("compile", letter, design, template))
+
+    def warm(self, letter: Letter, design: Design, template: str):
+        """
+        Compile the preamble format of a letter in the worker.
+        """
+        self._request(("warm", letter, design, template))
+
+    def _request(self, job: tuple):
+        with self.lock:
+            for attempt in range(2):
+                if not self.alive:
+                    self.start()
+                try:
+                    self.connection.send(job)
+                    status, value, self.preamble_key = self.connection.recv()
+                except (EOFError, OSError):
+                    self.close()
+                    continue
+                if status == "error":
+                    raise RuntimeError(value)
+                return value
+        raise RuntimeError("The LaTeX worker process died.")
+
+    def close(self):
+        """
+        Stop the worker process.
+        """
+        if self.connection is not None:
+            try:
+                self.connection.send(None)
+            except OSError:
+                pass
+            self.connection.close()
+            self.connection = None
+        if self.process is not None:
+            self.process.join(timeout=1.0)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+            self.process = None
@@ -0,0 +1,76 @@
+# Memory and throughput benchmark of the contact value types.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import sys
+import tracemalloc
+from time import perf_counter
+from hurtigbrief.abstraction import Person, GermanAddress
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+def timed(what: str, fun):
+    t0 = perf_counter()
+    res = fun()
+    t1 = perf_counter()
+    print("{:<40s} {:8.3f} s   {:10.0f} / s".format(what, t1-t0, N / (t1-t0)))
+    return res
+
+# Construction and memory:
+tracemalloc.start()
+def construct():
+    addresses = [GermanAddress("Musterstraße", str(i % 200 + 1),
+                               10000 + i % 90000, "Stadt " + str(i % 1000))
+                 for i in range(N)]
+    people = [Person("Person " + str(i), addresses[i],
+                     "person" + str(i) + "@example.org", None)
+              for i in range(N)]
+    return addresses, people
+addresses, people = timed("construct addresses and people", construct)
+current, peak = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+print("memory: {:.1f} MiB ({:.0f} bytes per contact)"
+      .format(current / 2**20, current / N))
+
+# Hashing as in `compute_contacts_hash` (first and repeated call):
+timed("contacts hash (first)",
+      lambda: hash((None, tuple(addresses), tuple(people))))
+timed("contacts hash (repeated)",
+      lambda: hash((None, tuple(addresses), tuple(people))))
+
+# Address index as in `save_contacts`, looked up by equal copies:
+a2i = timed("address index", lambda: {a : i for i,a in enumerate(addresses)})
+copies = [GermanAddress(a.street, a.number, a.postalcode, a.city)
+          for a in addresses]
+timed("address index lookup by value", lambda: [a2i[a] for a in copies])
+
+# Address composition (first and memoized call):
+timed("compose_address (first)", lambda: [p.compose_address() for p in people])
+timed("compose_address (repeated)",
+      lambda: [p.compose_address() for p in people])
+
+# Recipient search index:
+from hurtigbrief.contacts.search import ContactSearchIndex
+index = timed("search index construction", lambda: ContactSearchIndex(people))
+for query in ("person 12", "example", "pe", "stadt 17", "prson 123"):
+    t0 = perf_counter()
+    for i in range(100):
+        index.search(query)
+    t1 = perf_counter()
+    print("search {:<33s} {:8.3f} ms".format("'" + query + "'",
+                                             10 * (t1 - t0)))
@@ -0,0 +1,92 @@
+# Benchmark of the GUI startup: time to first paint and first preview.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# Usage: python scripts/benchmark_gui_startup.py [timeout]
+#
+# Starts the Hurtigbrief application with the configuration and contacts
+# of the current user and reports, measured from the start of this
+# script, the time to import the GUI, the time until the main window has
+# been drawn for the first time, and the time until the first preview
+# has been compiled and shown. For the preview, the first contact is used
+# as sender and destination unless a default sender is configured. The
+# application quits after the first preview or after `timeout` seconds
+# (default: 120).
+
+from time import perf_counter
+t_start = perf_counter()
+
+import sys
+from hurtigbrief.gui import HurtigbriefApp
+from hurtigbrief.gui.gtk import GLib
+
+t_import = perf_counter()
+timeout = float(sys.argv[1]) if len(sys.argv) > 1 else 120.0
+times = {}
+
+def report():
+    print("Import of the GUI:    {:8.1f} ms".format(1e3*(t_import - t_start)))
+    for what in ("first paint", "first preview"):
+        if what in times:
+            print("Time to {:<13s} {:8.1f} ms".format(what + ":",
+                                                     1e3*times[what]))
+        else:
+            print("Time to {:<13s}      n/a".format(what + ":"))
+
+
+def on_first_draw(window, cr):
+    if "first paint" not in times:
+        times["first paint"] = perf_counter() - t_start
+        GLib.idle_add(request_preview, window)
+    return False
+
+
+def request_preview(window):
+    if len(window.people) == 0:
+        print("No contacts: cannot compile a preview.")
+        window.get_application().quit()
+        return False
+    sender = window.sender if window.sender is not None else 0
+    if window.name_model_pending is None:
+        window.cb_sender.set_active(sender)
+        window.cb_destination.set_active(0)
+    else:
+        window.sender = sender
+        window.destination = 0
+        window.generate_letter()
+    return False
+
+
+def on_first_result(manager, result):
+    if "first preview" not in times:
+        times["first preview"] = perf_counter() - t_start
+        app.quit()
+
+
+def on_activate(app):
+    app.window.connect_after("draw", on_first_draw)
+
+
+app = HurtigbriefApp()
+# Connected after the application's own handlers, so that the window
+# exists and the preview has been reloaded:
+app.connect_after("activate", on_activate)
+app.task_manager.connect_after("notify_result", on_first_result)
+GLib.timeout_add(round(1e3 * timeout), app.quit)
+app.run()
+report()
@@ -0,0 +1,75 @@
+# Import time and startup benchmark of the configuration.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# Usage: python scripts/benchmark_startup.py [module] [contacts.sqlite]
+#
+# Reports the cumulative import time of a module (default:
+# hurtigbrief.gui.config) as measured by `python -X importtime`, the
+# slowest imports it pulls in, and, if a contact store is given, the time
+# to open the store and to read the names of all contacts in comparison
+# to materializing all people.
+
+import re
+import sys
+import subprocess
+from time import perf_counter
+
+module = sys.argv[1] if len(sys.argv) > 1 else "hurtigbrief.gui.config"
+
+# Import time in a fresh interpreter:
+proc = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                       "import " + module],
+                      capture_output=True, text=True)
+if proc.returncode != 0:
+    print(proc.stderr)
+    sys.exit(proc.returncode)
+
+line_re = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+imports = []
+for line in proc.stderr.splitlines():
+    match = line_re.match(line)
+    if match is not None:
+        imports.append((int(match.group(2)), len(match.group(3)),
+                        match.group(4)))
+
+total = [cumulative for cumulative, _, name in imports if name == module]
+print("Import of {}: {:.1f} ms".format(module, total[-1] / 1e3))
+print("Slowest top-level imports:")
+top = sorted((x for x in imports if x[1] == 1), reverse=True)[:10]
+for cumulative, _, name in top:
+    print("  {:<40s} {:8.1f} ms".format(name, cumulative / 1e3))
+
+# Contact store:
+if len(sys.argv) > 2:
+    from hurtigbrief.gui.config import Configuration
+    from pathlib import Path
+    path = Path(sys.argv[2])
+    conf = Configuration(path.parent, settings={})
+    t0 = perf_counter()
+    store = conf.contacts
+    t1 = perf_counter()
+    names = store.person_names()
+    t2 = perf_counter()
+    people = list(store.iter_people())
+    t3 = perf_counter()
+    print("Open the contact store:       {:8.1f} ms".format(1e3*(t1-t0)))
+    print("Read {:7d} names:           {:8.1f} ms".format(len(names),
+                                                         1e3*(t2-t1)))
+    print("Materialize {:7d} people:    {:8.1f} ms".format(len(people),
+                                                          1e3*(t3-t2)))
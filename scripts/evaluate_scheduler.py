@@ -0,0 +1,153 @@
+# Offline evaluation of the debounce delay proposed by the Scheduler.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# Usage: python scripts/evaluate_scheduler.py [compile time] [trace file]
+#
+# Replays keystroke sequences against the debounce policy of the
+# Scheduler at several quantiles and against the previous heuristic
+# (1.5 times the maximum of 1.5 times the mean keystroke waiting time and
+# the mean compile time). The keystroke waiting times are read from a
+# trace file (one waiting time in seconds per line) or are simulated for
+# a steady, a fast, and a bursty typist.
+#
+# For each policy, the script reports the number of compiles, the number
+# of wasted compiles (compiles whose result is outdated by a keystroke
+# before they finish), and the preview latency, that is, the time from
+# the last keystroke before a pause to the end of the compile that
+# includes it.
+
+import sys
+from math import exp, log
+from random import Random
+from typing import List
+from hurtigbrief.core import Scheduler
+
+# Waiting times above this (in seconds) end a burst of typing:
+PAUSE = 1.0
+
+
+class HeuristicScheduler(Scheduler):
+    """
+    The previous debounce heuristic.
+    """
+    def propose_delay(self) -> float:
+        if len(self.keystroke_times) == 0:
+            keystroke_time = 0.0
+        else:
+            keystroke_time = 1.5 * sum(self.keystroke_times) \
+                                   / len(self.keystroke_times)
+        if len(self.compile_times) == 0:
+            compile_time = 0.0
+        else:
+            compile_time = sum(self.compile_times) / len(self.compile_times)
+        return 1.5 * max(keystroke_time, compile_time)
+
+
+def loglogistic(rng: Random, median: float, shape: float) -> float:
+    u = rng.random()
+    return median * exp(log(u / (1.0 - u)) / shape)
+
+
+def simulate_typist(rng: Random, n: int, median: float, shape: float,
+                    burst: int, pause_median: float) -> List[float]:
+    """
+    Keystroke waiting times of bursts of log-logistic fly times,
+    separated by log-logistic pauses.
+    """
+    waits = []
+    while len(waits) < n:
+        for i in range(rng.randint(1, 2 * burst)):
+            waits.append(loglogistic(rng, median, shape))
+        waits.append(loglogistic(rng, pause_median, 4.0))
+    return waits[:n]
+
+
+def evaluate(scheduler: Scheduler, waits: List[float],
+             compile_time: float):
+    """
+    Replay the keystrokes. Compiles run one at a time; a compile that
+    is due while another one runs starts when that one finishes.
+    """
+    for _ in range(3):
+        scheduler.register_compile_time(compile_time)
+    t = 0.0
+    keys = [0.0]
+    for w in waits:
+        t += w
+        keys.append(t)
+    compiles = []
+    busy_until = 0.0
+    for i, key in enumerate(keys):
+        if i > 0:
+            scheduler.register_keystroke_waiting_time(key - keys[i-1])
+        due = key + scheduler.propose_delay()
+        if i + 1 < len(keys) and keys[i+1] < due:
+            # Debounced by the next keystroke.
+            continue
+        start = max(due, busy_until)
+        # A waiting compile is superseded by later keystrokes:
+        if i + 1 < len(keys) and keys[i+1] < start:
+            continue
+        busy_until = start + compile_time
+        compiles.append((i, start, busy_until))
+
+    wasted = 0
+    for i, start, end in compiles:
+        if i + 1 < len(keys) and keys[i+1] < end:
+            wasted += 1
+
+    # Latency after the last keystroke of each burst:
+    latencies = []
+    c = 0
+    for i, key in enumerate(keys):
+        if i + 1 < len(keys) and keys[i+1] - key < PAUSE:
+            continue
+        while c < len(compiles) and compiles[c][0] < i:
+            c += 1
+        if c < len(compiles):
+            latencies.append(compiles[c][2] - key)
+    latencies.sort()
+    mean = sum(latencies) / max(len(latencies), 1)
+    p90 = latencies[int(0.9 * (len(latencies) - 1))] if latencies else 0.0
+    return len(compiles), wasted, mean, p90
+
+
+compile_time = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+if len(sys.argv) > 2:
+    with open(sys.argv[2]) as f:
+        traces = {sys.argv[2] : [float(line) for line in f if line.strip()]}
+else:
+    rng = Random(20230508)
+    traces = {
+        "steady" : simulate_typist(rng, 20000, 0.18, 6.0, 40, 2.0),
+        "fast" : simulate_typist(rng, 20000, 0.09, 5.0, 60, 1.5),
+        "bursty" : simulate_typist(rng, 20000, 0.12, 2.5, 15, 2.5),
+    }
+
+print("compile time: {:.2f} s".format(compile_time))
+print("{:<8s} {:<14s} {:>8s} {:>8s} {:>12s} {:>12s}".format(
+      "trace", "policy", "compiles", "wasted", "latency [s]", "p90 [s]"))
+for name, waits in traces.items():
+    policies = [("heuristic", HeuristicScheduler())]
+    for q in (0.8, 0.9, 0.95, 0.99):
+        policies.append(("quantile " + str(q), Scheduler(quantile=q)))
+    for policy, scheduler in policies:
+        n, wasted, mean, p90 = evaluate(scheduler, waits, compile_time)
+        print("{:<8s} {:<14s} {:>8d} {:>8d} {:>12.3f} {:>12.3f}".format(
+              name, policy, n, wasted, mean, p90))
@@ -20,7 +20,10 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 from hurtigbrief.gui import HurtigbriefApp
 
-app = HurtigbriefApp()
-app.run()
+# The guard keeps worker processes, which import this module anew, from
+# starting the app:
+if __name__ == "__main__":
+    app = HurtigbriefApp()
+    app.run()
 
-print("done!")
+    print("done!")
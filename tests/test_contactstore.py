@@ -0,0 +1,53 @@
+# Tests of the contact store.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from hurtigbrief.contacts.store import ContactStore
+from hurtigbrief.contacts.journal import ContactJournal
+
+CONFIG = {
+    "addresses" : [
+        {"country" : "Germany", "street" : "Hauptstraße", "number" : "1",
+         "postalcode" : 10115, "city" : "Berlin"}
+    ],
+    "people" : [
+        {"name" : "Erika Mustermann", "address" : 0,
+         "email" : "erika@example.org", "phone" : None}
+    ],
+    "default_sender" : 0
+}
+
+
+def open_store(tmp_path) -> ContactStore:
+    return ContactStore(tmp_path / "contacts.sqlite",
+                        ContactJournal(tmp_path / "contacts.journal"))
+
+
+def test_migrated_store_reopens_clean(tmp_path):
+    store = open_store(tmp_path)
+    store.migrate_from_json(CONFIG)
+    assert not store.dirty
+    store.close()
+
+    store = open_store(tmp_path)
+    assert not store.dirty
+    assert store.journal.size == 0
+    assert len(list(store.journal)) == 0
+    assert store.default_sender == 0
+    assert store.people[0].name == "Erika Mustermann"
+    store.close()
@@ -0,0 +1,102 @@
+# Tests of the preamble format cache.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import pytest
+from threading import Thread
+from hurtigbrief.latex import preamblecache
+from hurtigbrief.latex.preamblecache import PreambleCache
+from hurtigbrief.latex.workspace import Workspace
+
+# A stand-in for the LaTeX engine that counts its runs, takes a while,
+# and writes the format file of its job name (or fails):
+FAKE_LATEX = """#!/bin/sh
+echo run >> "{log}"
+sleep 0.3
+job=$(echo "$2" | sed 's/-jobname=//; s/"//g')
+echo log > "$job.log"
+{action}
+"""
+
+
+@pytest.fixture
+def fake_latex(tmp_path, monkeypatch):
+    def make(fail: bool):
+        script = tmp_path / "fake-latex"
+        log = tmp_path / "runs"
+        action = "exit 1" if fail else 'echo fmt > "$job.fmt"'
+        script.write_text(FAKE_LATEX.format(log=log, action=action))
+        script.chmod(0o755)
+        monkeypatch.setattr(preamblecache, "latex_cmd", str(script))
+        return lambda: log.read_text().count("run") if log.exists() else 0
+    return make
+
+
+def request_concurrently(cache: PreambleCache, keys: str) -> list:
+    results = [None] * len(keys)
+    def request(i):
+        try:
+            results[i] = cache.get(keys[i], "preamble " + keys[i])
+        except RuntimeError as e:
+            results[i] = e
+    threads = [Thread(target=request, args=(i,)) for i in range(len(keys))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_single_flight(fake_latex):
+    runs = fake_latex(fail=False)
+    workspace = Workspace()
+    cache = PreambleCache(workspace)
+    results = request_concurrently(cache, "aaab")
+    assert runs() == 2
+    assert results[0] == results[1] == results[2] != results[3]
+    for fmt in results:
+        assert os.path.exists(fmt + ".fmt")
+    assert cache.is_current("a") and cache.is_current("b")
+
+
+def test_failed_build_is_shared(fake_latex):
+    runs = fake_latex(fail=True)
+    workspace = Workspace()
+    cache = PreambleCache(workspace)
+    results = request_concurrently(cache, "aaa")
+    assert runs() == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert os.listdir(workspace.directory.name) == []
+    assert not cache.is_current("a")
+
+
+def test_format_in_use_is_not_removed(fake_latex):
+    fake_latex(fail=False)
+    workspace = Workspace()
+    cache = PreambleCache(workspace, max_formats=1)
+    with cache.use("a", "preamble a") as fmt_a:
+        fmt_b = cache.get("b", "preamble b")
+        fmt_c = cache.get("c", "preamble c")
+        # Both "a" and "b" are evicted, but only "b" is removed:
+        assert not cache.is_current("a") and not cache.is_current("b")
+        assert os.path.exists(fmt_a + ".fmt")
+        assert not os.path.exists(fmt_b + ".fmt")
+    assert not os.path.exists(fmt_a + ".fmt")
+    assert os.path.exists(fmt_c + ".fmt")
+    assert cache.users == {} and cache.evicted == set()
@@ -0,0 +1,54 @@
+# Tests of the contact search index.
+#
+# Author: Malte J. Ziebarth (mjz.science@fmvkb.de)
+#
+# Copyright (C) 2023 Malte J. Ziebarth
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from hurtigbrief.abstraction import Person, GermanAddress
+from hurtigbrief.contacts.search import ContactSearchIndex, normalize
+
+NAMES = ["Maria Schmidt", "Mario Schneider", "Jürgen Müller", "Anna Weber",
+         "Marta Schulz"]
+
+
+def people():
+    address = GermanAddress("Hauptstraße", "1", 10115, "Berlin")
+    return [Person(name, address,
+                   normalize(name).replace(" ", ".") + "@example.org", None)
+            for name in NAMES]
+
+
+def test_normalize():
+    assert normalize("Jürgen MÜLLER") == "jurgen muller"
+
+
+def test_search():
+    index = ContactSearchIndex(people())
+    assert index.search("maria sch")[0] == 0
+    assert index.search("Müller")[0] == 2
+    assert set(index.search("ma", k=3)) == {0, 1, 4}
+    assert set(index.search("example", k=10)) == set(range(len(NAMES)))
+    # Misspelled:
+    assert index.search("mria schmdt")[0] == 0
+
+
+def test_update():
+    index = ContactSearchIndex(people())
+    index.update(3, Person("Anna Zimmermann",
+                           GermanAddress("Weg", "2", 20095, "Hamburg"),
+                           None, None))
+    assert index.search("zimmer")[0] == 3
+    assert 3 not in index.search("weber")